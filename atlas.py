@@ -0,0 +1,81 @@
+import pygame
+
+
+class TextureAtlas:
+    """Small images packed into a few large page surfaces, looked up by name.
+
+    Images are add()ed first and packed by build() into shelves, tallest
+    first. Every name then maps to a region (page, rect) for area blits and
+    to a subsurface of its page, which can be used anywhere a plain image
+    is expected while sharing the page's pixels.
+    """
+    def __init__(self, page_size=(2048, 2048), padding=1):
+        self.page_size = page_size
+        self.padding = padding
+        self.pending = {}
+        self.pages = []
+        self.regions = {}
+        self.images = {}
+
+    def __contains__(self, name):
+        return name in self.images
+
+    def __getitem__(self, name):
+        return self.images[name]
+
+    def __len__(self):
+        return len(self.images)
+
+    def get(self, name, default=None):
+        return self.images.get(name, default)
+
+    def region(self, name):
+        """Get the page holding an image and the rect of the image on it."""
+        return self.regions[name]
+
+    def add(self, name, image):
+        """Queue an image to be packed by the next build()."""
+        self.pending[name] = image
+
+    def build(self):
+        """Pack the queued images into new pages and make them available by name."""
+        page_width, page_height = self.page_size
+        padding = self.padding
+        # Placements (name, rect) per page
+        layouts = []
+        current = None
+        x = y = shelf_height = 0
+        order = sorted(self.pending, key=lambda name: self.pending[name].get_height(), reverse=True)
+        for name in order:
+            width, height = self.pending[name].get_size()
+            if width > page_width or height > page_height:
+                # Too big to share a page, it gets one of its own
+                layouts.append([(name, pygame.Rect(0, 0, width, height))])
+                continue
+            if current is not None and x + width > page_width:
+                x, y, shelf_height = 0, y + shelf_height + padding, 0
+            if current is None or y + height > page_height:
+                current = []
+                layouts.append(current)
+                x = y = shelf_height = 0
+            current.append((name, pygame.Rect(x, y, width, height)))
+            shelf_height = max(shelf_height, height)
+            x += width + padding
+
+        for placements in layouts:
+            # Pages are trimmed to what is packed on them
+            width = max(rect.right for _, rect in placements)
+            height = max(rect.bottom for _, rect in placements)
+            page = pygame.Surface((width, height), pygame.SRCALPHA)
+            page.fill((0, 0, 0, 0))
+            for name, rect in placements:
+                page.blit(self.pending[name], rect)
+                self.regions[name] = (page, rect)
+                self.images[name] = page.subsurface(rect)
+            self.pages.append(page)
+        self.pending.clear()
+
+
+def sized_name(name, size):
+    """Atlas name of an image packed at a given size."""
+    return f'{name}_{size[0]}x{size[1]}'
@@ -0,0 +1,120 @@
+import pygame
+from gameconst import BLACK
+
+# Colour key for star layers, must not be used by the stars themselves
+LAYER_KEY = (255, 0, 255)
+
+
+class ScrollLayer:
+    """One wrapped, vertically scrolling background layer."""
+    def __init__(self, image, speed):
+        self.image = image
+        self.speed = speed # px per ms
+        self.offset = 0.0
+        self.prev_offset = 0.0
+
+    def scroll(self, dt):
+        height = self.image.get_height()
+        self.prev_offset = self.offset
+        self.offset = (self.offset + self.speed * dt) % height
+
+    def offset_at(self, alpha):
+        """Offset interpolated between the last two scroll steps."""
+        offset = self.offset
+        if offset < self.prev_offset:
+            offset += self.image.get_height() # wrapped around during the last step
+        return (self.prev_offset + (offset - self.prev_offset) * alpha) % self.image.get_height()
+
+
+class ParallaxBackground:
+    """Full-screen background made of static images and scrolling star layers.
+
+    Static images are composited once into a single opaque base surface.
+    Star layers without partial transparency are turned into colour-keyed RLE
+    surfaces, which blit far faster than per-pixel alpha, and each is drawn
+    as two wrapped strips at its scroll offset. bake() merges slow layers into
+    the base, so they cost one opaque blit together with it.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.base = None
+        self.base_layer = None
+        self.layers = []
+
+    def add_static(self, image):
+        """Composite an image, scaled to the full size, into the base."""
+        image = pygame.transform.scale(image, self.size)
+        if self.base is None:
+            self.base = pygame.Surface(self.size)
+            self.base.fill(BLACK)
+        self.base.blit(image, (0, 0))
+
+    def add_layer(self, image, speed):
+        """Add a layer scrolling down by speed px per ms and return it."""
+        layer = ScrollLayer(prepare_layer(image), speed)
+        self.layers.append(layer)
+        self.layers.sort(key=lambda item: item.speed)
+        return layer
+
+    def bake(self, max_speed):
+        """Merge the layers no faster than max_speed into the base.
+
+        The base then scrolls at the speed of the fastest merged layer.
+        """
+        slow = [layer for layer in self.layers if layer.speed <= max_speed]
+        if not slow:
+            return
+        if self.base is None:
+            self.base = pygame.Surface(self.size)
+            self.base.fill(BLACK)
+        for layer in slow:
+            self.base.blit(layer.image, (0, 0))
+            self.layers.remove(layer)
+        self.base_layer = ScrollLayer(self.base, slow[-1].speed)
+
+    def scroll(self, dt):
+        if self.base_layer is not None:
+            self.base_layer.scroll(dt)
+        for layer in self.layers:
+            layer.scroll(dt)
+
+    def draw(self, surface, alpha=1.0):
+        """Draw the background at the given interpolation between scroll steps."""
+        if self.base is None:
+            surface.fill(BLACK)
+        elif self.base_layer is None:
+            surface.blit(self.base, (0, 0))
+        else:
+            blit_wrapped(surface, self.base, self.base_layer.offset_at(alpha))
+        for layer in self.layers:
+            blit_wrapped(surface, layer.image, layer.offset_at(alpha))
+
+    def composite(self):
+        """Get the current background flattened into one opaque surface."""
+        surface = pygame.Surface(self.size)
+        self.draw(surface)
+        return surface
+
+
+def prepare_layer(image):
+    """Convert a layer for fast blitting, using a colour key if its alpha is all or nothing."""
+    if image.get_flags() & pygame.SRCALPHA:
+        alpha = pygame.surfarray.pixels_alpha(image)
+        all_or_nothing = ((alpha == 0) | (alpha == 255)).all()
+        del alpha # unlock the surface
+        if all_or_nothing:
+            keyed = pygame.Surface(image.get_size())
+            keyed.fill(LAYER_KEY)
+            keyed.blit(image, (0, 0))
+            keyed.set_colorkey(LAYER_KEY, pygame.RLEACCEL)
+            return keyed
+    return image
+
+
+def blit_wrapped(surface, image, offset):
+    """Blit an image shifted down by offset, with the part pushed off the bottom wrapped to the top."""
+    y = int(offset)
+    surface.blit(image, (0, y))
+    if y > 0:
+        width, height = image.get_size()
+        surface.blit(image, (0, 0), pygame.Rect(0, height - y, width, y))
@@ -0,0 +1,144 @@
+# Headless benchmark: builds the Scrollex world without a window or audio device,
+# fills it with a configurable scene and measures the simulation (and optionally rendering).
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from gameconst import *
+
+
+def find_system(world, system_type):
+    for system in world.systems:
+        if isinstance(system, system_type):
+            return system
+    return None
+
+
+def build_world(screen, workers=0):
+    """Set up a ScrollexGame world the same way the game does, minus music and sounds."""
+    from ecs import Scheduler
+    from scrollex import ScrollexGame
+
+    game = ScrollexGame(screen)
+    game.load_assets(audio=False)
+    game.create_player()
+    game.create_game_state()
+    game.setup_systems()
+    game.create_background()
+    if workers:
+        game.world.scheduler = Scheduler(workers)
+    return game.world
+
+
+def populate(world, mobs=0, bullets=0, loot=0, particles=0):
+    """Add the requested number of mobs, bullets, loot and hit particles at random spots."""
+    from components import Player, Position
+    from systems import CollisionSystem, MobSpawningSystem, PlayerControlSystem
+
+    spawner = find_system(world, MobSpawningSystem)
+    collision = find_system(world, CollisionSystem)
+    control = find_system(world, PlayerControlSystem)
+
+    # Keep the player alive so the scene stays the same for the whole run
+    for _, (player,) in world.get_entities_with_components(Player):
+        player.hull = player.max_hull = float('inf')
+
+    spawner.min_mobs = mobs
+    for _ in range(mobs):
+        mob_type = random.choice(list(spawner.mob_types))
+        spawner.create_mob(mob_type, Position(random.uniform(0, WIN_WIDTH), random.uniform(0, WIN_HEIGHT)))
+    for _ in range(loot):
+        collision.create_loot(Position(random.uniform(0, WIN_WIDTH), random.uniform(0, WIN_HEIGHT)))
+    top_up(world, bullets, particles)
+
+
+def top_up(world, bullets=0, particles=0):
+    """Spawn bullets and hit particles at random spots until there are the requested numbers of them.
+
+    Bullets fly off screen and particles expire within a second, so this runs
+    before every frame to keep the scene the same for the whole run.
+    """
+    from components import Bullet, Player, Position
+    from systems import CollisionSystem, PlayerControlSystem
+
+    control = find_system(world, PlayerControlSystem)
+    collision = find_system(world, CollisionSystem)
+    for _ in range(bullets - world.query(Bullet).count()):
+        control.create_bullet(random.uniform(0, WIN_WIDTH), random.uniform(0, WIN_HEIGHT), Player())
+    while len(collision.particles) < min(particles, collision.particles.capacity):
+        collision.create_hit_particles(Position(random.uniform(0, WIN_WIDTH), random.uniform(0, WIN_HEIGHT)))
+    world.cleanup_entities()
+
+
+def run(world, frames, dt, render=False, bullets=0, particles=0):
+    """Run fixed-dt frames, topping up bullets and particles between them, and return the elapsed wall time in seconds.
+
+    The top-ups are not timed.
+    """
+    elapsed = 0.0
+    for _ in range(frames):
+        top_up(world, bullets, particles)
+        start = time.perf_counter()
+        world.process_update(dt)
+        if render:
+            world.process_render()
+        elif world.profiler is not None:
+            world.profiler.end_frame()
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def print_report(world, frames, elapsed):
+    print(f"{frames} frames in {elapsed:.3f} s: {frames / elapsed:.1f} FPS, "
+          f"{elapsed * 1000 / frames:.3f} ms/frame, {len(world.entities)} entities at the end")
+    if world.profiler is None:
+        return
+    print(f"{'system':<22}{'calls':>7}{'mean ms':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    report = world.profiler.report()
+    for name, stats in sorted(report.items(), key=lambda item: -item[1]['mean']):
+        print(f"{name:<22}{stats['calls']:>7}{stats['mean']:>10.3f}{stats['p50']:>9.3f}"
+              f"{stats['p95']:>9.3f}{stats['p99']:>9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Scrollex simulation headless and report its speed.")
+    parser.add_argument('--frames', type=int, default=600, help="number of frames to run")
+    parser.add_argument('--dt', type=float, default=SIM_DT, help="simulation step in ms")
+    parser.add_argument('--mobs', type=int, default=300)
+    parser.add_argument('--bullets', type=int, default=100)
+    parser.add_argument('--loot', type=int, default=50)
+    parser.add_argument('--particles', type=int, default=500)
+    parser.add_argument('--render', action='store_true', help="also run the render systems to an off-screen surface")
+    parser.add_argument('--workers', type=int, default=0, help="run update systems on a thread pool")
+    parser.add_argument('--no-profile', action='store_true', help="skip per-system timings")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+    screen = pygame.Surface((WIN_WIDTH, WIN_HEIGHT)).convert()
+
+    world = build_world(screen, args.workers)
+    populate(world, args.mobs, args.bullets, args.loot, args.particles)
+    if not args.no_profile:
+        world.enable_profiling(window=args.frames)
+
+    elapsed = run(world, args.frames, args.dt, args.render, args.bullets, args.particles)
+    print_report(world, args.frames, elapsed)
+    if world.scheduler is not None:
+        world.scheduler.shutdown()
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,31 @@
 from dataclasses import dataclass
 import pygame
-from ecs import Component
+from ecs import Component, Column
+from gameconst import COLLISION_MATRIX, LAYER_DEFAULT
 
 @dataclass
 class Position(Component):
-    x: float
-    y: float
+    x: float = Column()
+    y: float = Column()
+    # Position at the start of the last simulation tick, used for render interpolation
+    prev_x: float = Column(None)
+    prev_y: float = Column(None)
+
+    def __post_init__(self):
+        if self.prev_x is None:
+            self.prev_x = self.x
+        if self.prev_y is None:
+            self.prev_y = self.y
+
+    def place(self, x, y):
+        """Move to a new spot without interpolating from the old one."""
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
 
 @dataclass
 class Velocity(Component):
-    dx: float = 0.0
-    dy: float = 0.0
+    dx: float = Column(0.0)
+    dy: float = Column(0.0)
 
 @dataclass
 class Sprite(Component):
@@ -50,7 +65,14 @@ class Bullet(Component):
 
 @dataclass
 class Collision(Component):
-    radius: int
+    radius: int = Column()
+    layer: int = LAYER_DEFAULT
+    mask: int = None # layers this collider touches, COLLISION_MATRIX[layer] by default
+    swept: bool = False # fast mover: test the whole step from the previous position, not just the end
+
+    def __post_init__(self):
+        if self.mask is None:
+            self.mask = COLLISION_MATRIX.get(self.layer, 0)
 
 @dataclass
 class Animation(Component):
@@ -61,7 +83,7 @@ class Animation(Component):
 
 @dataclass
 class Lifetime(Component):
-    time_to_live: int
+    time_to_live: int = Column()
 
 @dataclass
 class GameState(Component):
@@ -72,15 +94,12 @@ class GameState(Component):
 
 @dataclass
 class Rotation(Component):
-    angle: float = 0.0
-    speed: float = 0.0
-    inertia: float = 1.0
+    angle: float = Column(0.0)
+    speed: float = Column(0.0)
+    inertia: float = Column(1.0)
 
 @dataclass
 class Loot(Component):
     type: str
     value: int
 
-@dataclass
-class Background(Component):
-    pass # Tag component
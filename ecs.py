@@ -1,66 +1,689 @@
 import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import MISSING
+import numpy as np
 
 class Component:
     """Base class for all components."""
     pass
 
-class World:
+class Column:
+    """Numeric component field that can live in a NumPy array owned by an archetype.
+
+    While the component is stored columnar the instance is only a view on its
+    row, otherwise the value is kept on the instance like a plain attribute.
+    """
+    def __init__(self, default=MISSING):
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, component, owner=None):
+        if component is None:
+            if self.default is MISSING:
+                raise AttributeError(self.name)
+            return self.default
+        arrays = component.__dict__.get('_arrays')
+        if arrays is None:
+            return component.__dict__[self.name]
+        return arrays[self.name][component._row].item()
+
+    def __set__(self, component, value):
+        arrays = component.__dict__.get('_arrays')
+        if arrays is None:
+            component.__dict__[self.name] = value
+        else:
+            arrays[self.name][component._row] = value
+
+INDEX_BITS = 24
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+def get_columns(component_type):
+    """Get the names of the columnar fields of a component type."""
+    columns = component_type.__dict__.get('_columns')
+    if columns is None:
+        columns = tuple(name for klass in reversed(component_type.__mro__)
+                        for name, value in vars(klass).items() if isinstance(value, Column))
+        component_type._columns = columns
+    return columns
+
+class EntityTable:
+    """Dense per-slot entity storage addressed by generational handles.
+
+    A handle packs the slot index into its low INDEX_BITS bits and the slot
+    generation above them. Freed slots bump their generation and are reused,
+    so stale handles of destroyed entities never resolve to a new entity.
+    """
+    def __init__(self):
+        self.generations = []
+        self.components = []
+        self.archetypes = []
+        self.rows = []
+        self.free_slots = deque()
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, entity_id):
+        index = entity_id & INDEX_MASK
+        return index < len(self.generations) and self.generations[index] == entity_id >> INDEX_BITS \
+            and self.components[index] is not None
+
+    def __getitem__(self, entity_id):
+        if entity_id not in self:
+            raise KeyError(entity_id)
+        return self.components[entity_id & INDEX_MASK]
+
+    def __iter__(self):
+        for index, components in enumerate(self.components):
+            if components is not None:
+                yield self.generations[index] << INDEX_BITS | index
+
+    def get(self, entity_id, default=None):
+        index = entity_id & INDEX_MASK
+        if index < len(self.generations) and self.generations[index] == entity_id >> INDEX_BITS:
+            components = self.components[index]
+            if components is not None:
+                return components
+        return default
+
+    def allocate(self, components):
+        """Take a free slot, or a new one, and return the handle for it."""
+        with self.lock:
+            if self.free_slots:
+                index = self.free_slots.popleft()
+                self.components[index] = components
+            else:
+                index = len(self.generations)
+                if index > INDEX_MASK:
+                    raise RuntimeError("Entity limit reached")
+                self.generations.append(0)
+                self.components.append(components)
+                self.archetypes.append(None)
+                self.rows.append(0)
+            self.count += 1
+            return self.generations[index] << INDEX_BITS | index
+
+    def free(self, entity_id):
+        """Release the slot of a live handle and invalidate the handle."""
+        index = entity_id & INDEX_MASK
+        self.generations[index] += 1
+        self.components[index] = None
+        self.archetypes[index] = None
+        self.free_slots.append(index)
+        self.count -= 1
+
+class Pooled(Component):
+    """Tag that hands an entity's components back to its pool when the entity is destroyed."""
+    def __init__(self, pool):
+        self.pool = pool
+
+class EntityPool:
+    """Recycles the components of short-lived entities built from one template.
+
+    factory(*args, **kwargs) builds a fresh list of components and
+    reset(components, *args, **kwargs) reinitialises a type -> component dict
+    for a new spawn. When a spawned entity is destroyed its components return
+    here instead of being garbage collected.
+    """
+    def __init__(self, factory, reset, max_size=1024):
+        self.factory = factory
+        self.reset = reset
+        self.max_size = max_size
+        self.free = []
+        self.component_types = None
+        self.tag = Pooled(self)
+
+    def __len__(self):
+        return len(self.free)
+
+    def spawn(self, world, *args, **kwargs):
+        """Create an entity from recycled components, or fresh ones if the pool is empty."""
+        try:
+            components = self.free.pop()
+        except IndexError:
+            components = {type(component): component for component in self.factory(*args, **kwargs)}
+            if self.component_types is None:
+                self.component_types = frozenset(components)
+        self.reset(components, *args, **kwargs)
+        return world.create_entity(*components.values(), self.tag)
+
+    def release(self, components):
+        """Take back the components of a destroyed entity if they still match the template."""
+        components = {ct: component for ct, component in components.items() if ct is not Pooled}
+        if len(self.free) < self.max_size and frozenset(components) == self.component_types:
+            self.free.append(components)
+
+    def clear(self):
+        self.free.clear()
+
+class Archetype:
+    """Storage for all entities that share the exact same set of component types."""
+    def __init__(self, component_types, columnar=False):
+        self.component_types = frozenset(component_types)
+        self.entity_ids = []
+        self.columns = {component_type: [] for component_type in self.component_types}
+        self.queries = []
+        # Struct-of-arrays storage for components with Column fields
+        self.capacity = 0
+        self.arrays = {}
+        if columnar:
+            for component_type in self.component_types:
+                names = get_columns(component_type)
+                if names:
+                    self.arrays[component_type] = {name: np.zeros(0) for name in names}
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def array(self, component_type, name):
+        """Get a live view on one columnar field of all entities in the archetype."""
+        return self.arrays[component_type][name][:len(self.entity_ids)]
+
+    def _grow(self):
+        self.capacity = max(16, self.capacity * 2)
+        for fields in self.arrays.values():
+            for name, array in fields.items():
+                grown = np.zeros(self.capacity)
+                grown[:len(array)] = array
+                fields[name] = grown
+
+    def _bind(self, component, fields, row):
+        for name, array in fields.items():
+            array[row] = getattr(component, name)
+        component._arrays = fields
+        component._row = row
+
+    def _unbind(self, component, fields, row):
+        for name, array in fields.items():
+            component.__dict__[name] = array[row].item()
+        del component._arrays
+        del component._row
+
+    def matches(self, component_types):
+        """Check if this archetype holds every one of the given component types."""
+        return self.component_types.issuperset(component_types)
+
+    def append(self, entity_id, components):
+        """Append an entity row taking its components from a type -> component dict."""
+        row = len(self.entity_ids)
+        self.entity_ids.append(entity_id)
+        for component_type, column in self.columns.items():
+            column.append(components[component_type])
+        if self.arrays:
+            if row >= self.capacity:
+                self._grow()
+            for component_type, fields in self.arrays.items():
+                self._bind(components[component_type], fields, row)
+        return row
+
+    def remove(self, row):
+        """Remove a row by moving the last row into its place, returning the moved entity id."""
+        last = len(self.entity_ids) - 1
+        moved_id = None
+        for component_type, fields in self.arrays.items():
+            self._unbind(self.columns[component_type][row], fields, row)
+        if row != last:
+            moved_id = self.entity_ids[last]
+            self.entity_ids[row] = moved_id
+            for column in self.columns.values():
+                column[row] = column[last]
+            for component_type, fields in self.arrays.items():
+                for array in fields.values():
+                    array[row] = array[last]
+                self.columns[component_type][row]._row = row
+        self.entity_ids.pop()
+        for column in self.columns.values():
+            column.pop()
+        return moved_id
+
+    def replace(self, row, component):
+        """Replace one component of a row without moving it."""
+        component_type = type(component)
+        fields = self.arrays.get(component_type)
+        if fields is not None:
+            self._unbind(self.columns[component_type][row], fields, row)
+            self._bind(component, fields, row)
+        self.columns[component_type][row] = component
+
+    def clear(self):
+        """Remove all entity rows."""
+        for component_type, fields in self.arrays.items():
+            for row, component in enumerate(self.columns[component_type]):
+                self._unbind(component, fields, row)
+        self.entity_ids.clear()
+        for column in self.columns.values():
+            column.clear()
+
+class Query:
+    """Cached set of entities that have all of the given component types."""
+    def __init__(self, component_types):
+        self.component_types = tuple(component_types)
+        self.archetypes = []
+        self.entity_ids = set()
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def __iter__(self):
+        for archetype in list(self.archetypes):
+            columns = [archetype.columns[ct] for ct in self.component_types]
+            # Stop at the current row count so entities created meanwhile are not visited
+            for entity_id, *components in itertools.islice(zip(archetype.entity_ids, *columns), len(archetype)):
+                yield entity_id, components
+
+    def count(self):
+        """Number of matching entities."""
+        return len(self.entity_ids)
+
+    def column(self, component_type, name):
+        """Concatenate a columnar field over all matching entities, in iteration order."""
+        arrays = [archetype.array(component_type, name) for archetype in self.archetypes]
+        return np.concatenate(arrays) if arrays else np.zeros(0)
+
+class CommandBuffer:
+    """Structural changes recorded while systems run and applied in one batch at a sync point."""
     def __init__(self):
-        self.entities = {}
-        self.next_entity_id = 0
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def create_entity(self, entity_id):
+        self.commands.append(('create', entity_id, None))
+
+    def add_component(self, entity_id, component):
+        self.commands.append(('add', entity_id, component))
+
+    def remove_component(self, entity_id, component_type):
+        self.commands.append(('remove', entity_id, component_type))
+
+    def clear(self):
+        self.commands.clear()
+
+    def apply(self, world):
+        """Apply all recorded commands in the order they were recorded."""
+        commands, self.commands = self.commands, []
+        for command, entity_id, argument in commands:
+            if entity_id not in world.entities:
+                continue
+            if command == 'create':
+                world._insert_entity(entity_id)
+            elif command == 'add':
+                world._add_component(entity_id, argument)
+            else:
+                world._remove_component(entity_id, argument)
+
+class Scheduler:
+    """Runs update systems in stages on a thread pool.
+
+    Systems declare the component types they read and write. A system is
+    placed in the stage after the last earlier system it conflicts with, so
+    systems sharing a stage never write anything the others touch. Systems
+    without declarations conflict with everything and keep the plain order.
+    """
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='system')
+        self.stages = []
+        self._systems = ()
+
+    @staticmethod
+    def conflicts(first, second):
+        """Check if two systems must not run at the same time."""
+        if first.reads is None or first.writes is None or second.reads is None or second.writes is None:
+            return True
+        first_writes = set(first.writes)
+        second_writes = set(second.writes)
+        return bool(first_writes & (second_writes | set(second.reads)) or second_writes & set(first.reads))
+
+    def build_stages(self, systems):
+        """Group systems into stages that can each run concurrently."""
+        stage_of = []
+        for i, system in enumerate(systems):
+            stage = 0
+            for j in range(i):
+                if self.conflicts(systems[j], system):
+                    stage = max(stage, stage_of[j] + 1)
+            stage_of.append(stage)
+        stages = [[] for _ in range(max(stage_of, default=-1) + 1)]
+        for system, stage in zip(systems, stage_of):
+            stages[stage].append(system)
+        return stages
+
+    def run(self, systems, call, *args, **kwargs):
+        """Run the systems stage by stage, calling call(system, *args, **kwargs) for each."""
+        systems = tuple(systems)
+        if systems != self._systems:
+            self.stages = self.build_stages(systems)
+            self._systems = systems
+        for stage in self.stages:
+            if len(stage) == 1:
+                call(stage[0], *args, **kwargs)
+                continue
+            futures = [self.executor.submit(call, system, *args, **kwargs) for system in stage]
+            for future in futures:
+                future.result()
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+class SystemStats:
+    """Timing samples of one system."""
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.total_calls = 0
+        self.frame_calls = 0
+        self.frame_time = 0.0
+        self.last_calls = 0
+        self.last_time = 0.0
+
+    def end_frame(self):
+        self.samples.append(self.frame_time)
+        self.last_calls = self.frame_calls
+        self.last_time = self.frame_time
+        self.frame_calls = 0
+        self.frame_time = 0.0
+
+class Profiler:
+    """Per-system wall time, call counts and query sizes collected by World.
+
+    Times are in milliseconds. Samples are grouped into frames by end_frame(),
+    which World.process_render calls; percentiles cover the last window frames.
+    """
+    def __init__(self, window=300):
+        self.window = window
+        self.stats = {}
+        self.query_counts = {}
+        self.frames = 0
+        self.lock = threading.Lock()
+
+    def _get_stats(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            with self.lock:
+                stats = self.stats.setdefault(name, SystemStats(self.window))
+        return stats
+
+    def measure(self, system, *args, **kwargs):
+        """Run a system and record how long it took."""
+        start = time.perf_counter()
+        try:
+            return system.process(*args, **kwargs)
+        finally:
+            stats = self._get_stats(type(system).__name__)
+            stats.frame_time += (time.perf_counter() - start) * 1000.0
+            stats.frame_calls += 1
+            stats.total_calls += 1
+
+    def count_query(self, query):
+        self.query_counts[query.component_types] = query.count()
+
+    def end_frame(self):
+        """Close the current frame and push its timings into the rolling window."""
+        for stats in self.stats.values():
+            stats.end_frame()
+        self.frames += 1
+
+    def report(self):
+        """Get a name -> timings dict with the last frame and p50/p95/p99 over the window."""
+        report = {}
+        for name, stats in self.stats.items():
+            samples = np.array(stats.samples) if stats.samples else np.zeros(1)
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+            report[name] = {
+                'calls': stats.last_calls,
+                'total_calls': stats.total_calls,
+                'ms': stats.last_time,
+                'mean': float(samples.mean()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99),
+            }
+        return report
+
+    def query_report(self):
+        """Get the entity count of every query seen, keyed by component type names."""
+        return {tuple(ct.__name__ for ct in types): count for types, count in self.query_counts.items()}
+
+    def reset(self):
+        self.stats.clear()
+        self.query_counts.clear()
+        self.frames = 0
+
+def process_system(system, *args, **kwargs):
+    return system.process(*args, **kwargs)
+
+class World:
+    def __init__(self, columnar=False):
+        self.columnar = columnar
+        self.entities = EntityTable()
         self.systems = []
         self.entities_to_remove = set()
+        # While set, structural changes go to the command buffer so queries can iterate live storage
+        self.defer_changes = False
+        self.commands = CommandBuffer()
+        self.scheduler = None
+        self.profiler = None
+        # Fraction of a simulation tick to interpolate rendered positions by
+        self.interpolation_alpha = 1.0
+        # Contact lists published by a contact system for the current update, None outside of it
+        self.contacts = None
+        self._query_lock = threading.Lock()
+        self.archetypes = {}
+        self.component_index = {}
+        self.queries = {}
+        # Component type -> [(on_add, on_remove)] callbacks, see observe()
+        self.observers = {}
+
+    def _get_archetype(self, component_types):
+        """Get the archetype for an exact set of component types, creating it if needed."""
+        archetype = self.archetypes.get(component_types)
+        if archetype is None:
+            archetype = Archetype(component_types, self.columnar)
+            self.archetypes[archetype.component_types] = archetype
+            for query in self.queries.values():
+                if archetype.matches(query.component_types):
+                    query.archetypes.append(archetype)
+                    archetype.queries.append(query)
+        return archetype
+
+    def _remove_row(self, index):
+        """Remove the archetype row of the entity in a slot."""
+        archetype = self.entities.archetypes[index]
+        moved_id = archetype.remove(self.entities.rows[index])
+        if moved_id is not None:
+            self.entities.rows[moved_id & INDEX_MASK] = self.entities.rows[index]
+        return archetype
+
+    def _move_entity(self, entity_id, components):
+        """Move an entity to the archetype matching its current component set."""
+        index = entity_id & INDEX_MASK
+        old_archetype = self._remove_row(index)
+        archetype = self._get_archetype(frozenset(components))
+        self.entities.rows[index] = archetype.append(entity_id, components)
+        self.entities.archetypes[index] = archetype
+        for query in old_archetype.queries:
+            if not archetype.matches(query.component_types):
+                query.entity_ids.discard(entity_id)
+        for query in archetype.queries:
+            if not old_archetype.matches(query.component_types):
+                query.entity_ids.add(entity_id)
+
+    def query(self, *component_types):
+        """Get the cached query for a set of component types."""
+        query = self.queries.get(component_types)
+        if query is None:
+            with self._query_lock:
+                query = self._create_query(component_types)
+        if self.profiler is not None:
+            self.profiler.count_query(query)
+        return query
+
+    def _create_query(self, component_types):
+        query = self.queries.get(component_types)
+        if query is None:
+            query = Query(component_types)
+            for archetype in self.archetypes.values():
+                if archetype.matches(component_types):
+                    query.archetypes.append(archetype)
+                    archetype.queries.append(query)
+            if component_types:
+                # Intersect starting from the smallest index to keep the work minimal
+                indexes = sorted((self.component_index.get(ct, set()) for ct in component_types), key=len)
+                query.entity_ids = indexes[0].intersection(*indexes[1:])
+            else:
+                query.entity_ids = set(self.entities)
+            self.queries[component_types] = query
+        return query
+
+    def is_alive(self, entity_id):
+        """Check if a handle still refers to an existing entity."""
+        return entity_id in self.entities
+
+    def get_archetype(self, entity_id):
+        """Get the archetype an entity is stored in."""
+        if entity_id not in self.entities:
+            return None
+        return self.entities.archetypes[entity_id & INDEX_MASK]
 
     def create_entity(self, *components):
         """Create a new entity and add components to it."""
-        entity_id = self.next_entity_id
-        self.entities[entity_id] = {}
-        for component in components:
-            self.add_component(entity_id, component)
-        self.next_entity_id += 1
+        entity_components = {type(component): component for component in components}
+        entity_id = self.entities.allocate(entity_components)
+        if self.defer_changes:
+            self.commands.create_entity(entity_id)
+        else:
+            self._insert_entity(entity_id)
         return entity_id
 
+    def _insert_entity(self, entity_id):
+        """Place an allocated entity into its archetype and the indexes."""
+        index = entity_id & INDEX_MASK
+        entity_components = self.entities.components[index]
+        for component_type in entity_components:
+            self.component_index.setdefault(component_type, set()).add(entity_id)
+        archetype = self._get_archetype(frozenset(entity_components))
+        self.entities.rows[index] = archetype.append(entity_id, entity_components)
+        self.entities.archetypes[index] = archetype
+        for query in archetype.queries:
+            query.entity_ids.add(entity_id)
+        if self.observers:
+            self._notify(0, entity_id, entity_components)
+
+    def observe(self, component_type, on_add=None, on_remove=None):
+        """Call on_add(entity_id, component) or on_remove(entity_id, component) whenever
+        a component of the type is attached to or detached from an entity."""
+        self.observers.setdefault(component_type, []).append((on_add, on_remove))
+
+    def _notify(self, event, entity_id, components):
+        """Run the on_add (event 0) or on_remove (event 1) observers of the given components."""
+        for component_type, component in list(components.items()):
+            for callbacks in self.observers.get(component_type, ()):
+                callback = callbacks[event]
+                if callback is not None:
+                    callback(entity_id, component)
+
     def remove_entity(self, entity_id):
         """Mark an entity for removal at the end of the frame."""
         self.entities_to_remove.add(entity_id)
-        
+
+    def _destroy_entity(self, entity_id):
+        """Remove an entity from storage and free its slot."""
+        archetype = self._remove_row(entity_id & INDEX_MASK)
+        for query in archetype.queries:
+            query.entity_ids.discard(entity_id)
+        components = self.entities[entity_id]
+        for component_type in components:
+            self.component_index[component_type].discard(entity_id)
+        self.entities.free(entity_id)
+        if self.observers:
+            self._notify(1, entity_id, components)
+        pooled = components.get(Pooled)
+        if pooled is not None:
+            pooled.pool.release(components)
 
     def cleanup_entities(self):
-        """Remove all entities marked for deletion."""
-        
+        """Apply deferred changes and remove all entities marked for deletion."""
+        self.commands.apply(self)
+
         for entity_id in self.entities_to_remove:
             if entity_id in self.entities:
-                del self.entities[entity_id]
-                
+                self._destroy_entity(entity_id)
+
         self.entities_to_remove.clear()
-        
+
 
     def clear_all_entities(self):
         """Remove all entities from the world."""
-        self.entities.clear()
+        removed = [(entity_id, self.entities[entity_id]) for entity_id in self.entities] if self.observers else ()
+        for archetype in self.archetypes.values():
+            archetype.clear()
+        for entity_id in list(self.entities):
+            self.entities.free(entity_id)
+        for entity_ids in self.component_index.values():
+            entity_ids.clear()
+        for query in self.queries.values():
+            query.entity_ids.clear()
+        self.commands.clear()
         self.entities_to_remove.clear()
+        for entity_id, components in removed:
+            self._notify(1, entity_id, components)
 
     def add_component(self, entity_id, component):
         """Add a component to an entity."""
+        if self.defer_changes:
+            self.commands.add_component(entity_id, component)
+        else:
+            self._add_component(entity_id, component)
+
+    def _add_component(self, entity_id, component):
         component_type = type(component)
-        self.entities[entity_id][component_type] = component
+        components = self.entities[entity_id]
+        replaced = components.get(component_type)
+        if replaced is not None:
+            index = entity_id & INDEX_MASK
+            self.entities.archetypes[index].replace(self.entities.rows[index], component)
+            components[component_type] = component
+        else:
+            components[component_type] = component
+            self.component_index.setdefault(component_type, set()).add(entity_id)
+            self._move_entity(entity_id, components)
+        if component_type in self.observers:
+            if replaced is not None:
+                self._notify(1, entity_id, {component_type: replaced})
+            self._notify(0, entity_id, {component_type: component})
 
     def remove_component(self, entity_id, component_type):
         """Remove a component from an entity."""
-        if component_type in self.entities[entity_id]:
-            del self.entities[entity_id][component_type]
+        if self.defer_changes:
+            self.commands.remove_component(entity_id, component_type)
+        else:
+            self._remove_component(entity_id, component_type)
+
+    def _remove_component(self, entity_id, component_type):
+        components = self.entities[entity_id]
+        if component_type in components:
+            component = components.pop(component_type)
+            self.component_index[component_type].discard(entity_id)
+            self._move_entity(entity_id, components)
+            if component_type in self.observers:
+                self._notify(1, entity_id, {component_type: component})
 
     def get_component(self, entity_id, component_type):
         """Get a component from an entity."""
         component = self.entities.get(entity_id, {}).get(component_type)
-        
+
         return component
 
     def get_entities_with_components(self, *component_types):
         """Get all entities that have a certain set of components."""
-        for entity_id, components in list(self.entities.items()):
-            if all(ct in components for ct in component_types):
-                yield entity_id, [components[ct] for ct in component_types]
+        return iter(self.query(*component_types))
 
     def add_system(self, system):
         """Add a system to the world."""
@@ -69,19 +692,48 @@ class World:
 
     def process_update(self, *args, **kwargs):
         """Process all systems that are not for rendering."""
-        for system in self.systems:
-            if not getattr(system, 'is_render_system', False):
-                system.process(*args, **kwargs)
+        systems = [system for system in self.systems if not getattr(system, 'is_render_system', False)]
+        call = process_system if self.profiler is None else self.profiler.measure
+        self.defer_changes = True
+        try:
+            if self.scheduler is not None:
+                self.scheduler.run(systems, call, *args, **kwargs)
+            else:
+                for system in systems:
+                    call(system, *args, **kwargs)
+        finally:
+            self.defer_changes = False
+            self.contacts = None
         self.cleanup_entities()
 
     def process_render(self):
         """Process all rendering systems."""
+        if self.profiler is not None:
+            for system in self.systems:
+                if getattr(system, 'is_render_system', False):
+                    self.profiler.measure(system)
+            self.profiler.end_frame()
+            return
+
         for system in self.systems:
             if getattr(system, 'is_render_system', False):
                 system.process()
 
+    def enable_profiling(self, window=300):
+        """Start collecting per-system timings and return the profiler."""
+        if self.profiler is None:
+            self.profiler = Profiler(window)
+        return self.profiler
+
+    def disable_profiling(self):
+        self.profiler = None
+
 class System:
     """Base class for all systems."""
+    # Component types the system reads and writes; None means unknown
+    reads = None
+    writes = None
+
     def __init__(self):
         self.world = None
 
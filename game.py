@@ -16,6 +16,10 @@ class Game(object):
     def init(self):
         pass
 
+    def unload(self):
+        """Let go of shared resources when this scene is replaced by a new instance."""
+        pass
+
     def GetPaused(self):
         return self.paused
 
@@ -33,7 +37,7 @@ class Game(object):
         if new_game or entity == GameOver: # Always create new instance for GameOver
             for i, e in enumerate(self.entity):
                 if isinstance(e, entity):
-                    self.entity.pop(i)
+                    self.entity.pop(i).unload()
                     break
             game = entity(self.screen, **kwargs)
             self.add(game)
@@ -52,6 +56,10 @@ class Game(object):
                 if i != Game and i != game:
                     i.SetPause(True)
 
+    def get_dirty_rects(self):
+        """Screen areas changed by the last draw, or None if the whole screen has to be pushed."""
+        return None
+
     def getEntity(self, entity):
         for i in self.entity:
             if i.__class__ == entity:
@@ -70,7 +78,13 @@ class Game(object):
             if game_instance:
                 game_instance.draw()
         
+        rects = None
         if self.active and self.active.running:
             self.active.draw()
+            if not self.paused:
+                rects = self.active.get_dirty_rects()
 
-        pygame.display.flip()
\ No newline at end of file
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
\ No newline at end of file
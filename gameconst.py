@@ -3,6 +3,45 @@ from os import path
 WIN_WIDTH = 1920  # ширина игрового окна
 WIN_HEIGHT = 1080 # высота игрового окна
 FPS = 60 # частота кадров в секунду
+SIM_RATE = 60 # тактов симуляции в секунду
+SIM_DT = 1000 / SIM_RATE # длительность такта симуляции, мс
+MAX_SIM_STEPS = 5 # максимум тактов симуляции за один кадр
+MAX_FRAME_TIME = 250 # максимальное время кадра, учитываемое симуляцией, мс
+RENDER_SCALE = 1.0 # масштаб внутреннего разрешения мира относительно окна (0.5 - 960x540)
+RENDER_MARGIN = 16 # запас вокруг экрана, в пределах которого спрайты ещё рисуются, пикс
+DIRTY_RECTS = False # перерисовывать только изменившиеся области экрана (для программного рендеринга)
+SIM_WORKERS = 0 # потоков для параллельного запуска систем (0 - последовательно)
+# Слои столкновений (битовые флаги)
+LAYER_PLAYER = 1 # корабль игрока
+LAYER_MOB = 2 # метеориты
+LAYER_BULLET = 4 # пули
+LAYER_LOOT = 8 # добыча
+LAYER_EFFECT = 16 # частицы и прочие эффекты, ни с чем не сталкиваются
+LAYER_DEFAULT = 32 # слой по умолчанию, сталкивается со всеми
+LAYER_ALL = LAYER_PLAYER | LAYER_MOB | LAYER_BULLET | LAYER_LOOT | LAYER_EFFECT | LAYER_DEFAULT
+# Матрица столкновений: маска слоёв, с которыми сталкивается каждый слой
+COLLISION_MATRIX = {
+    LAYER_PLAYER: LAYER_MOB | LAYER_LOOT | LAYER_DEFAULT,
+    LAYER_MOB: LAYER_PLAYER | LAYER_MOB | LAYER_BULLET | LAYER_DEFAULT,
+    LAYER_BULLET: LAYER_MOB | LAYER_DEFAULT,
+    LAYER_LOOT: LAYER_PLAYER | LAYER_DEFAULT,
+    LAYER_EFFECT: 0,
+    LAYER_DEFAULT: LAYER_ALL,
+}
+# Решатель столкновений
+RESTITUTION = 0.8 # упругость столкновений
+SOLVER_ITERATIONS = 4 # итераций решателя импульсов за такт
+SLEEP_SPEED = 0.005 # скорость сближения, ниже которой контакт считается покоящимся, пикс/мс
+SLEEP_FRAMES = 30 # тактов покоя, после которых группа тел засыпает
+# Кэш повёрнутых спрайтов
+ROTATION_STEPS = 128 # различных углов поворота на полный оборот
+ROTATION_CACHE_MB = 64 # предельный объём кэша, МБ
+ASSET_CACHE_MB = 256 # предельный объём кэша загруженных изображений, МБ
+TEXT_CACHE_SIZE = 256 # отрисованных строк текста в кэше
+PARTICLE_CAPACITY = 4096 # предельное число частиц одновременно
+BG_BAKE_SPEED = 0 # слои фона не быстрее этой скорости запекаются в основу (0 - не запекать), пикс/мс
+# Размеры метеоритов
+MOB_SIZES = {'small': (30, 30), 'medium': (60, 60), 'large': (100, 100)}
 # Цвета (R, G, B)
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
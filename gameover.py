@@ -1,7 +1,7 @@
 import pygame
 import pygame_gui
 from game import Game
-from utils import draw_text, WIN_WIDTH, WIN_HEIGHT, BLACK, Button, img_dir, path, snd_dir
+from utils import draw_text, WIN_WIDTH, WIN_HEIGHT, BLACK, Button, path, snd_dir, assets
 
 
 class GameOver(Game):
@@ -9,14 +9,16 @@ class GameOver(Game):
         super().__init__(screen)
         self.running = False
         self.score = score
-        self.background = pygame.image.load(
-            path.join(img_dir, 'bg1920.jpg')).convert()
+        self.background = assets.acquire('bg1920.jpg', alpha=False)
         self.background_rect = self.background.get_rect()
         self.manager = pygame_gui.UIManager((WIN_WIDTH, WIN_HEIGHT))
         self.newgame_button = pygame_gui.elements.UIButton(relative_rect=pygame.Rect((WIN_WIDTH / 2-100, WIN_HEIGHT * 3 / 4), (200, 80)),
                                                           text='New Game',
                                                           manager=self.manager)
         
+    def unload(self):
+        assets.release('bg1920.jpg', alpha=False)
+
     def init(self):
         pygame.mixer.music.load(path.join(snd_dir, 'Deep Space Destructors - From The Ashes.mp3'))
         pygame.mixer.music.set_volume(0.1)
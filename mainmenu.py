@@ -4,13 +4,13 @@ import pygame_gui
 from game import Game
 from scrollex import ScrollexGame
 from gameconst import *
+from utils import assets
 
 
 class Main_menu(Game):
     def __init__(self, screen):
         super().__init__(screen)
-        self.background = pygame.image.load(
-            path.join(img_dir, 'bg1920.jpg')).convert()
+        self.background = assets.acquire('bg1920.jpg', alpha=False)
         self.background_rect = self.background.get_rect()
             
         self.manager = pygame_gui.UIManager((WIN_WIDTH, WIN_HEIGHT))
@@ -0,0 +1,110 @@
+import numpy as np
+import pygame
+
+
+class ParticleField:
+    """Short-lived sparks kept in NumPy arrays instead of entities.
+
+    Every particle has a position, the position of the previous step (for
+    render interpolation), a velocity in px per ms, a time to live in ms and
+    a colour index into the palette. Live particles are packed at the start
+    of the arrays, so a step is a handful of vectorized operations and
+    drawing is one Surface.blits call per colour.
+    """
+    def __init__(self, capacity=4096, size=3, seed=None):
+        self.capacity = capacity
+        self.size = size
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.ttl = np.zeros(capacity)
+        self.colors = np.zeros(capacity, dtype=np.intp)
+        self.palette = []
+        self.dots = {}
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, x, y, count, speed=0.3, ttl=(100, 300), color=(128, 128, 128)):
+        """Spray count particles from (x, y) with velocities up to speed px per ms on each axis.
+
+        Particles that do not fit into the capacity are dropped.
+        """
+        start = self.count
+        end = min(start + count, self.capacity)
+        new = end - start
+        if new <= 0:
+            return
+        color = tuple(color)
+        if color not in self.palette:
+            self.palette.append(color)
+        self.x[start:end] = self.prev_x[start:end] = x
+        self.y[start:end] = self.prev_y[start:end] = y
+        self.dx[start:end] = self.rng.uniform(-speed, speed, new)
+        self.dy[start:end] = self.rng.uniform(-speed, speed, new)
+        self.ttl[start:end] = self.rng.integers(ttl[0], ttl[1], new, endpoint=True)
+        self.colors[start:end] = self.palette.index(color)
+        self.count = end
+
+    def step(self, dt):
+        """Move all particles by dt ms and drop the expired ones."""
+        n = self.count
+        if not n:
+            return
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.x[:n] += self.dx[:n] * dt
+        self.y[:n] += self.dy[:n] * dt
+        self.ttl[:n] -= dt
+        alive = self.ttl[:n] > 0
+        if alive.all():
+            return
+        keep = np.flatnonzero(alive)
+        self.count = len(keep)
+        for array in (self.x, self.y, self.prev_x, self.prev_y, self.dx, self.dy, self.ttl, self.colors):
+            array[:self.count] = array[keep]
+
+    def clear(self):
+        self.count = 0
+
+    def dot(self, color_index, size):
+        """Get the shared square surface drawn for one particle of a colour."""
+        key = (color_index, size)
+        dot = self.dots.get(key)
+        if dot is None:
+            dot = self.dots[key] = pygame.Surface((size, size))
+            dot.fill(self.palette[color_index])
+        return dot
+
+    def draw(self, surface, alpha=1.0, scale=1.0, rects=False):
+        """Draw the particles interpolated between the last two steps.
+
+        scale maps positions to surface pixels. Returns the drawn rects if
+        rects is set, otherwise an empty list.
+        """
+        n = self.count
+        if not n:
+            return []
+        size = max(1, round(self.size * scale))
+        x = (self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha) * scale - size / 2
+        y = (self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha) * scale - size / 2
+        width, height = surface.get_size()
+        visible = (x > -size) & (x < width) & (y > -size) & (y < height)
+        left = x.astype(int)
+        top = y.astype(int)
+        colors = self.colors[:n]
+        drawn = []
+        for color_index in np.unique(colors[visible]).tolist():
+            chosen = visible & (colors == color_index)
+            dot = self.dot(color_index, size)
+            batch = [(dot, position) for position in zip(left[chosen].tolist(), top[chosen].tolist())]
+            if rects:
+                drawn.extend(surface.blits(batch))
+            else:
+                surface.blits(batch, False)
+        return drawn
@@ -11,8 +11,7 @@ class Pause_menu(Game):
         super().__init__(screen)
         self.running = False
         self.paused = True # Added this line
-        self.background = pygame.image.load(
-            path.join(img_dir, 'bg1920.jpg')).convert()
+        self.background = assets.acquire('bg1920.jpg', alpha=False)
         self.background_rect = self.background.get_rect()
         self.manager = pygame_gui.UIManager((WIN_WIDTH, WIN_HEIGHT))
         self.resume_button = pygame_gui.elements.UIButton(relative_rect=pygame.Rect((WIN_WIDTH/2-400/2, 375), (400, 80)),
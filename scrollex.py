@@ -1,23 +1,44 @@
 import pygame
 import random
 from os import path
-from ecs import World
+from ecs import World, Scheduler
+from background import ParallaxBackground
 from components import *
 from systems import (
     MovementSystem, RenderSystem, PlayerControlSystem, 
-    CollisionSystem, AnimationSystem, LifetimeSystem, 
+    ContactSystem, CollisionSystem, AnimationSystem, LifetimeSystem, 
     BoundarySystem, MobSpawningSystem, LootSystem, UISystem, RotationSystem,
-    BackgroundSystem
+    BackgroundSystem, UpscaleSystem, ParticleSystem, ParticleRenderSystem,
+    LOOT_COLORS, LOOT_SIZE
 )
+from atlas import TextureAtlas, sized_name
+from particles import ParticleField
 from gameconst import *
 from utils import *
 from game import Game
 from gameover import GameOver
 
 class ScrollexGame(Game):
-    def __init__(self, screen):
+    def __init__(self, screen, dirty_rects=DIRTY_RECTS, render_scale=RENDER_SCALE):
         super().__init__(screen)
-        self.world = World()
+        self.world = World(columnar=True)
+        if SIM_WORKERS:
+            self.world.scheduler = Scheduler(SIM_WORKERS)
+        self.accumulator = 0.0
+        self.skip_draw = False
+        # Redraw only what changed; the background is then flattened once and does not scroll
+        self.dirty = DirtyRects() if dirty_rects else None
+        # The world can be drawn to a smaller canvas that is stretched over the window,
+        # gameplay keeps using window coordinates. Dirty rects always work at full size.
+        self.render_scale = 1.0 if dirty_rects else render_scale
+        if self.render_scale == 1.0:
+            self.canvas = screen
+            canvas_size = (WIN_WIDTH, WIN_HEIGHT)
+        else:
+            canvas_size = (round(WIN_WIDTH * self.render_scale), round(WIN_HEIGHT * self.render_scale))
+            self.canvas = pygame.Surface(canvas_size)
+        self.background = ParallaxBackground(canvas_size)
+        self.particles = ParticleField(PARTICLE_CAPACITY)
 
     def init(self):
         self.load_assets()
@@ -29,75 +50,99 @@ class ScrollexGame(Game):
         pygame.mixer.music.set_volume(0.12)
         pygame.mixer.music.play(loops=-1, fade_ms=2000)
 
-    def load_assets(self):
-        self.bg_images = [
-            pygame.image.load(path.join(img_dir, f'bg{i}.png')).convert() for i in range(1, 5)
-        ]
-        self.bg_images.append(pygame.image.load(path.join(img_dir, 'bg5.jpg')).convert())
-        self.meteor_images = [
-            pygame.image.load(path.join(img_dir, f'rock{i}.png')).convert_alpha() for i in range(1, 5)
-        ]
-        self.expl_sounds = [
-            pygame.mixer.Sound(path.join(snd_dir, f'explosion{i}.wav')) for i in range(2, 5, 2)
-        ]
-        self.hit_sounds = [
-            pygame.mixer.Sound(path.join(snd_dir, 'gluhoy-udar.mp3'))
-        ]
+    def unload(self):
+        # Stop the system worker threads, a replacement game brings its own
+        if self.world.scheduler is not None:
+            self.world.scheduler.shutdown()
+            self.world.scheduler = None
+
+    def load_assets(self, audio=True):
+        # Images come from the shared asset cache, so a new game does not read them from disk again
+        self.bg_images = [assets.get(f'bg{i}.png', alpha=False) for i in range(1, 5)]
+        self.bg_images.append(assets.get('bg5.jpg', alpha=False))
+        self.meteor_images = [assets.get(f'rock{i}.png') for i in range(1, 5)]
+        if audio:
+            self.expl_sounds = [
+                pygame.mixer.Sound(path.join(snd_dir, f'explosion{i}.wav')) for i in range(2, 5, 2)
+            ]
+            self.hit_sounds = [
+                pygame.mixer.Sound(path.join(snd_dir, 'gluhoy-udar.mp3'))
+            ]
+        else:
+            self.expl_sounds = [SilentSound()]
+            self.hit_sounds = [SilentSound()]
         self.explosion_anim = load_explosion_animation()
 
+        # Every sprite image at every size it is drawn at, packed together
+        atlas = self.atlas = TextureAtlas()
+        for index in range(len(self.meteor_images)):
+            for size in MOB_SIZES.values():
+                atlas.add(sized_name(f'rock{index}', size), assets.get(f'rock{index + 1}.png', size))
+        atlas.add('jet', assets.get('jet.png', (50, 70)))
+        bullet_size = Player().bullet_size
+        atlas.add(sized_name('bullet', bullet_size), assets.get('bullet.png', bullet_size))
+        for size, frames in self.explosion_anim.items():
+            for index, frame in enumerate(frames):
+                atlas.add(f'explosion_{size}{index}', frame)
+        for loot_type, color in LOOT_COLORS.items():
+            loot_img = pygame.Surface(LOOT_SIZE)
+            loot_img.fill(color)
+            atlas.add(f'loot_{loot_type}', loot_img)
+        atlas.build()
+        self.explosion_anim = {
+            size: [atlas[f'explosion_{size}{index}'] for index in range(len(frames))]
+            for size, frames in self.explosion_anim.items()
+        }
+
     def setup_systems(self):
         self.world.add_system(MovementSystem())
         self.world.add_system(RotationSystem())
-        self.world.add_system(BackgroundSystem())
-        self.world.add_system(PlayerControlSystem())
-        self.world.add_system(CollisionSystem(self.explosion_anim, self.expl_sounds, self.meteor_images, self.hit_sounds))
+        self.world.add_system(BackgroundSystem(self.background))
+        self.world.add_system(PlayerControlSystem(self.atlas))
+        self.world.add_system(ContactSystem())
+        self.world.add_system(CollisionSystem(self.explosion_anim, self.expl_sounds, self.meteor_images, self.hit_sounds, self.particles, self.atlas))
+        self.world.add_system(ParticleSystem(self.particles))
         self.world.add_system(AnimationSystem())
         self.world.add_system(LifetimeSystem())
         self.world.add_system(BoundarySystem())
-        self.world.add_system(MobSpawningSystem(self.meteor_images))
+        self.world.add_system(MobSpawningSystem(self.meteor_images, self.atlas))
         self.world.add_system(LootSystem())
-        self.world.add_system(RenderSystem(self.screen)) # RenderSystem before UISystem
-        self.world.add_system(UISystem(self.screen)) # UISystem should be last for rendering on top
-
-    def create_background(self):
-        # Static background
-        bg_choice = self.bg_images[0] # Use the first image as static
-        bg_image = pygame.transform.scale(bg_choice, (WIN_WIDTH, WIN_HEIGHT))
-        self.world.create_entity(
-            Position(WIN_WIDTH / 2, WIN_HEIGHT / 2),
-            Sprite(bg_image, bg_image.get_rect(), layer=0)
+        render_system = RenderSystem(self.canvas, dirty=self.dirty, scale=self.render_scale)
+        # Every rock sprite is one of these, so their rotations can be made up front
+        render_system.warm(
+            self.atlas[sized_name(f'rock{index}', size)] for index in range(len(self.meteor_images)) for size in MOB_SIZES.values()
         )
+        self.world.add_system(render_system) # RenderSystem before UISystem
+        self.world.add_system(ParticleRenderSystem(self.canvas, self.particles, self.dirty, self.render_scale))
+        if self.canvas is not self.screen:
+            self.world.add_system(UpscaleSystem(self.canvas, self.screen)) # HUD is drawn at full size on top
+        self.world.add_system(UISystem(self.screen, self.dirty)) # UISystem should be last for rendering on top
 
-        # Slow stars
-        slow_stars = create_starfield(WIN_WIDTH, WIN_HEIGHT, 200, (150, 150, 150), (0.5, 1.5))
-        for i in range(2):
-            self.world.create_entity(
-                Position(WIN_WIDTH / 2, i * WIN_HEIGHT - WIN_HEIGHT / 2),
-                Velocity(dy=0.02),
-                Sprite(slow_stars, slow_stars.get_rect(), layer=1),
-                Background()
-            )
-
-        # Fast stars
-        fast_stars = create_starfield(WIN_WIDTH, WIN_HEIGHT, 50, (200, 200, 200), (1, 2))
-        for i in range(2):
-            self.world.create_entity(
-                Position(WIN_WIDTH / 2, i * WIN_HEIGHT - WIN_HEIGHT / 2),
-                Velocity(dy=0.05),
-                Sprite(fast_stars, fast_stars.get_rect(), layer=2),
-                Background()
-            )
+    def create_background(self):
+        # Static background, slow and fast stars
+        scale = self.render_scale
+        width, height = self.background.size
+        self.background.add_static(self.bg_images[0]) # Use the first image as static
+        slow_stars = create_starfield(width, height, 200, (150, 150, 150), (max(0.5, 0.5 * scale), 1.5 * scale))
+        self.background.add_layer(slow_stars, 0.02 * scale)
+        fast_stars = create_starfield(width, height, 50, (200, 200, 200), (max(0.5, 1 * scale), 2 * scale))
+        self.background.add_layer(fast_stars, 0.05 * scale)
+        if BG_BAKE_SPEED:
+            self.background.bake(BG_BAKE_SPEED * scale)
+        if self.dirty is not None:
+            # Everything behind the sprites is flattened into one surface to restore dirty areas from
+            self.dirty.background = self.background.composite()
+            self.dirty.invalidate()
 
     def create_player(self):
-        player_img = pygame.image.load(path.join(img_dir, "jet.png")).convert_alpha()
-        player_img = pygame.transform.scale(player_img, (50, 70))
+        player_img = self.atlas['jet']
         self.world.create_entity(
             Position(WIN_WIDTH / 2, WIN_HEIGHT - 50),
             Velocity(),
             Sprite(player_img, player_img.get_rect(), layer=4),
             PlayerInput(),
             Player(),
-            Collision(25)
+            Collision(25, LAYER_PLAYER)
         )
 
     def create_game_state(self):
@@ -118,18 +163,47 @@ class ScrollexGame(Game):
                     self.parent.start(Pause_menu)
 
         if self.parent.GetPaused():
+            self.skip_draw = False
             return
-            
-        self.world.process_update(dt)
+
+        # Run the simulation in fixed ticks no matter how long the frame took
+        self.accumulator += min(dt, MAX_FRAME_TIME)
+        steps = 0
+        while self.accumulator >= SIM_DT and steps < MAX_SIM_STEPS:
+            self.world.process_update(SIM_DT)
+            self.accumulator -= SIM_DT
+            steps += 1
+
+        # Still behind: give the next frame to the simulation, but never skip two draws in a row
+        behind = self.accumulator >= SIM_DT
+        self.skip_draw = behind and not self.skip_draw
+        if behind:
+            self.accumulator = min(self.accumulator, SIM_DT * MAX_SIM_STEPS)
+        self.world.interpolation_alpha = min(self.accumulator / SIM_DT, 1.0)
         self.check_player_death()
-        
+
 
     def draw(self):
-        self.screen.fill(BLACK)
+        if self.skip_draw:
+            return
+        if self.dirty is None:
+            self.background.draw(self.canvas, self.world.interpolation_alpha)
+        else:
+            if self.parent.GetPaused():
+                # The pause menu draws over us, so repaint everything once we are back
+                self.dirty.invalidate()
+            self.dirty.restore(self.screen)
         self.world.process_render()
 
+    def get_dirty_rects(self):
+        if self.dirty is None:
+            return None
+        if self.skip_draw:
+            return []
+        return self.dirty.flush()
+
     def check_player_death(self):
-        if not any(self.world.get_entities_with_components(PlayerInput)):
+        if not self.world.query(PlayerInput).count():
             # Get the game state to pass the score to GameOver screen
             game_state_entity = next(iter(self.world.get_entities_with_components(GameState)), None)
             
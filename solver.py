@@ -0,0 +1,109 @@
+import numpy as np
+
+
+def find_islands(count, pairs_a, pairs_b):
+    """Label bodies 0..count-1 by the connected group of contacts they belong to."""
+    parent = list(range(count))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in zip(pairs_a, pairs_b):
+        root_a, root_b = root(a), root(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([root(i) for i in range(count)], dtype=np.intp)
+
+
+class ContactSolver:
+    """Resolves the velocity impulses of all contacts of a frame in vectorized batches.
+
+    Every iteration computes the impulse of each contact from the current
+    velocities and applies them all at once, accumulating a non-negative
+    impulse per contact. A body touching several others gets a
+    proportional share of each correction, so dense clusters settle
+    instead of overshooting. One iteration gives every isolated pair
+    exactly the classic restitution impulse.
+
+    Bodies whose contacts have all been at rest for sleep_frames frames
+    fall asleep, and the contacts of islands where everyone sleeps are
+    skipped until any of their contacts starts moving again.
+    """
+    def __init__(self, restitution=0.8, iterations=1, sleep_speed=0.005, sleep_frames=30):
+        self.restitution = restitution
+        self.iterations = iterations
+        self.sleep_speed = sleep_speed
+        self.sleep_frames = sleep_frames
+        # Consecutive resting frames per body key
+        self.rest_frames = {}
+
+    def solve(self, keys, x, y, vx, vy, inv_mass, pairs_a, pairs_b, can_sleep=None):
+        """Solve the contacts between the bodies of pairs_a and pairs_b.
+
+        keys identify the bodies between frames for sleeping, can_sleep masks
+        the bodies allowed to sleep. Returns the new vx and vy and the
+        impulse given to each contact.
+        """
+        count = len(keys)
+        vx = np.array(vx, dtype=float)
+        vy = np.array(vy, dtype=float)
+        inv_mass = np.asarray(inv_mass, dtype=float)
+        pairs_a = np.asarray(pairs_a, dtype=np.intp)
+        pairs_b = np.asarray(pairs_b, dtype=np.intp)
+        impulses = np.zeros(len(pairs_a))
+        if not len(pairs_a):
+            self.rest_frames = {}
+            return vx, vy, impulses
+
+        dx = x[pairs_a] - x[pairs_b]
+        dy = y[pairs_a] - y[pairs_b]
+        dist = np.hypot(dx, dy)
+        touching = np.flatnonzero(dist > 0)
+        a = pairs_a[touching]
+        b = pairs_b[touching]
+        nx = dx[touching] / dist[touching]
+        ny = dy[touching] / dist[touching]
+        vel_along_normal = (vx[a] - vx[b]) * nx + (vy[a] - vy[b]) * ny
+
+        awake = self._update_sleep(keys, count, a, b, vel_along_normal, can_sleep)
+        # Separating contacts need no impulse
+        solved = np.flatnonzero(awake & (vel_along_normal < 0))
+        a, b, nx, ny = a[solved], b[solved], nx[solved], ny[solved]
+        target = -self.restitution * vel_along_normal[solved]
+        inv_mass_sum = inv_mass[a] + inv_mass[b]
+        contacts_per_body = np.bincount(a, minlength=count) + np.bincount(b, minlength=count)
+        share = 1.0 / np.maximum(contacts_per_body[a], contacts_per_body[b])
+
+        accumulated = np.zeros(len(solved))
+        for _ in range(self.iterations):
+            vel = (vx[a] - vx[b]) * nx + (vy[a] - vy[b]) * ny
+            total = np.maximum(accumulated + (target - vel) / inv_mass_sum * share, 0.0)
+            applied = total - accumulated
+            accumulated = total
+            impulse_x = applied * nx
+            impulse_y = applied * ny
+            np.add.at(vx, a, impulse_x * inv_mass[a])
+            np.add.at(vy, a, impulse_y * inv_mass[a])
+            np.subtract.at(vx, b, impulse_x * inv_mass[b])
+            np.subtract.at(vy, b, impulse_y * inv_mass[b])
+
+        impulses[touching[solved]] = accumulated
+        return vx, vy, impulses
+
+    def _update_sleep(self, keys, count, a, b, vel_along_normal, can_sleep):
+        """Advance the rest counters and get which contacts belong to awake islands."""
+        resting = np.abs(vel_along_normal) < self.sleep_speed
+        body_resting = np.ones(count, dtype=bool) if can_sleep is None else np.array(can_sleep, dtype=bool)
+        np.logical_and.at(body_resting, a, resting)
+        np.logical_and.at(body_resting, b, resting)
+        frames = np.array([self.rest_frames.get(key, 0) for key in keys])
+        frames = np.where(body_resting, frames + 1, 0)
+        self.rest_frames = {key: rest for key, rest in zip(keys, frames.tolist()) if rest}
+
+        islands = find_islands(count, a.tolist(), b.tolist())
+        island_awake = np.zeros(count, dtype=bool)
+        np.logical_or.at(island_awake, islands, frames < self.sleep_frames)
+        return island_awake[islands[a]]
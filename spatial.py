@@ -0,0 +1,110 @@
+from math import floor
+import numpy as np
+
+
+class SpatialHash:
+    """Uniform grid broad phase that maps cells to the items whose bounds overlap them.
+
+    Items are inserted with a circle (x, y, radius) and land in every cell
+    their bounding box touches, so two overlapping circles always share at
+    least one cell. Pick a cell size around the diameter of the common items.
+    """
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def clear(self):
+        self.cells.clear()
+
+    def _cell_range(self, x, y, radius):
+        size = self.cell_size
+        return (floor((x - radius) / size), floor((x + radius) / size),
+                floor((y - radius) / size), floor((y + radius) / size))
+
+    def insert(self, item, x, y, radius):
+        x0, x1, y0, y1 = self._cell_range(x, y, radius)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = [item]
+                else:
+                    cell.append(item)
+
+    def query(self, x, y, radius):
+        """Get the items sharing a cell with the given circle's bounds."""
+        x0, x1, y0, y1 = self._cell_range(x, y, radius)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            return set(cells.get((x0, y0), ()))
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        return found
+
+    def pairs(self):
+        """Get every pair (a, b) with a < b of items sharing at least one cell."""
+        pairs = set()
+        for cell in self.cells.values():
+            count = len(cell)
+            if count < 2:
+                continue
+            for i in range(count - 1):
+                a = cell[i]
+                for j in range(i + 1, count):
+                    b = cell[j]
+                    pairs.add((a, b) if a < b else (b, a))
+        return pairs
+
+
+def narrow_phase(a, b, pairs_a, pairs_b):
+    """Test candidate circle pairs in one vectorized pass.
+
+    a and b are (x, y, radius) array triples, pairs_a and pairs_b hold the
+    indexes of each candidate pair in them. Returns the index arrays of the
+    pairs that overlap, in candidate order.
+    """
+    pairs_a = np.asarray(pairs_a, dtype=np.intp)
+    pairs_b = np.asarray(pairs_b, dtype=np.intp)
+    ax, ay, ar = a
+    bx, by, br = b
+    dx = ax[pairs_a] - bx[pairs_b]
+    dy = ay[pairs_a] - by[pairs_b]
+    radii = ar[pairs_a] + br[pairs_b]
+    hits = dx * dx + dy * dy < radii * radii
+    return pairs_a[hits], pairs_b[hits]
+
+
+def swept_phase(a, a_start, b, b_start, pairs_a, pairs_b):
+    """Test candidate circle pairs over a whole step of straight-line motion.
+
+    a and b are (x, y, radius) array triples at the end of the step, a_start
+    and b_start the (x, y) arrays at its start. A pair hits if the circles
+    overlap at any time during the step, which is the closest approach of
+    their relative motion segment to the origin. Returns the index arrays of
+    the pairs that hit, in candidate order.
+    """
+    pairs_a = np.asarray(pairs_a, dtype=np.intp)
+    pairs_b = np.asarray(pairs_b, dtype=np.intp)
+    ax, ay, ar = a
+    bx, by, br = b
+    start_x = a_start[0][pairs_a] - b_start[0][pairs_b]
+    start_y = a_start[1][pairs_a] - b_start[1][pairs_b]
+    move_x = ax[pairs_a] - bx[pairs_b] - start_x
+    move_y = ay[pairs_a] - by[pairs_b] - start_y
+    length_sq = move_x * move_x + move_y * move_y
+    moved = length_sq > 0
+    t = np.zeros(len(pairs_a))
+    t[moved] = np.clip(-(start_x[moved] * move_x[moved] + start_y[moved] * move_y[moved]) / length_sq[moved], 0.0, 1.0)
+    dx = start_x + t * move_x
+    dy = start_y + t * move_y
+    radii = ar[pairs_a] + br[pairs_b]
+    hits = dx * dx + dy * dy < radii * radii
+    return pairs_a[hits], pairs_b[hits]
@@ -1,59 +1,381 @@
 import pygame
 import random
-from os import path
-from ecs import System
+import numpy as np
+from math import hypot
+import weakref
+from ecs import System, EntityPool
+from spatial import SpatialHash, narrow_phase, swept_phase
+from solver import ContactSolver
+from particles import ParticleField
+from atlas import sized_name
 from components import *
 from gameconst import *
 from utils import *
 
+def gather_circles(world, query, entities):
+    """Get x, y and radius arrays of query results that start with Position and Collision."""
+    if world.columnar:
+        return query.column(Position, 'x'), query.column(Position, 'y'), query.column(Collision, 'radius')
+    circles = np.array([(position.x, position.y, collision.radius) for _, (position, collision, *_) in entities], dtype=float)
+    circles = circles.reshape(-1, 3)
+    return circles[:, 0], circles[:, 1], circles[:, 2]
+
+def gather_starts(world, query, entities):
+    """Get the previous x and y arrays of query results that start with Position."""
+    if world.columnar:
+        return query.column(Position, 'prev_x'), query.column(Position, 'prev_y')
+    starts = np.array([(position.prev_x, position.prev_y) for _, (position, *_) in entities], dtype=float)
+    starts = starts.reshape(-1, 2)
+    return starts[:, 0], starts[:, 1]
+
+# Scheduling key of world.contacts: ContactSystem writes it, the systems reacting to contacts read it
+CONTACTS = 'contacts'
+# Scheduling key of the particle field: emitters and ParticleSystem both write it
+PARTICLES = 'particles'
+
+def find_contacts(world, grids=None, cell_size=128):
+    """Find the touching colliders whose layers and masks accept each other.
+
+    Returns lists of (first, second) entity id pairs keyed by their (first, second)
+    layer pair, lower layer first. Layer pairs no collider asks for are never
+    enumerated, the rest go through a per-layer grid and one narrow phase pass.
+    Swept colliders are tested over their whole last step, from the previous
+    to the current Position, so fast movers can not tunnel through anything.
+    """
+    query = world.query(Position, Collision)
+    colliders = list(query)
+    contacts = {}
+    if not colliders:
+        return contacts
+    if grids is None:
+        grids = {}
+    entity_ids = [entity_id for entity_id, _ in colliders]
+    circles = gather_circles(world, query, colliders)
+    layers = np.array([collision.layer for _, (_, collision) in colliders], dtype=np.int64)
+    masks = np.array([collision.mask for _, (_, collision) in colliders], dtype=np.int64)
+    swept = np.array([collision.swept for _, (_, collision) in colliders], dtype=bool)
+    bounds = circles
+    if swept.any():
+        starts = gather_starts(world, query, colliders)
+        # Broad phase bounds of a swept collider enclose its whole step
+        x, y, radius = circles
+        start_x, start_y = starts
+        step = np.where(swept, np.hypot(x - start_x, y - start_y), 0.0)
+        bounds = ((x + start_x) / 2, (y + start_y) / 2, radius + step / 2)
+    members = {int(layer): np.flatnonzero(layers == layer) for layer in np.unique(layers)}
+    wanted = {layer: int(np.bitwise_or.reduce(masks[indexes])) for layer, indexes in members.items()}
+
+    for layer in grids:
+        grids[layer].clear()
+    filled = set()
+
+    def fill(layer):
+        grid = grids.get(layer)
+        if grid is None:
+            grid = grids[layer] = SpatialHash(cell_size)
+        if layer not in filled:
+            for index, (x, y, radius) in enumerate(zip(*(array[members[layer]].tolist() for array in bounds))):
+                grid.insert(index, x, y, radius)
+            filled.add(layer)
+        return grid
+
+    for first in sorted(members):
+        for second in sorted(members):
+            if second < first or not wanted[first] & second or not wanted[second] & first:
+                continue
+            grid = fill(second)
+            second_members = members[second]
+            if first == second:
+                pairs = np.array(sorted(grid.pairs()), dtype=np.intp).reshape(-1, 2)
+                candidates_a = second_members[pairs[:, 0]]
+                candidates_b = second_members[pairs[:, 1]]
+            else:
+                candidates_a = []
+                candidates_b = []
+                first_members = members[first]
+                probes = zip(first_members.tolist(), *(array[first_members].tolist() for array in bounds))
+                for index, x, y, radius in probes:
+                    nearby = grid.query(x, y, radius)
+                    if nearby:
+                        candidates_a.extend([index] * len(nearby))
+                        candidates_b.extend(second_members[sorted(nearby)].tolist())
+                candidates_a = np.array(candidates_a, dtype=np.intp)
+                candidates_b = np.array(candidates_b, dtype=np.intp)
+            # Per-entity masks may still refuse a pair their layers allow
+            accepted = (layers[candidates_b] & masks[candidates_a] != 0) & (layers[candidates_a] & masks[candidates_b] != 0)
+            candidates_a = candidates_a[accepted]
+            candidates_b = candidates_b[accepted]
+            if bounds is circles:
+                hit_a, hit_b = narrow_phase(circles, circles, candidates_a, candidates_b)
+            else:
+                moving = swept[candidates_a] | swept[candidates_b]
+                hit_a, hit_b = narrow_phase(circles, circles, candidates_a[~moving], candidates_b[~moving])
+                swept_a, swept_b = swept_phase(circles, starts, circles, starts, candidates_a[moving], candidates_b[moving])
+                hit_a = np.concatenate((hit_a, swept_a))
+                hit_b = np.concatenate((hit_b, swept_b))
+            if len(hit_a):
+                contacts[(first, second)] = [(entity_ids[a], entity_ids[b]) for a, b in zip(hit_a.tolist(), hit_b.tolist())]
+    return contacts
+
+def get_contacts(world, first, second):
+    """Get the (first layer, second layer) entity id pairs touching this frame.
+
+    Uses the contacts ContactSystem published for the frame, or finds them
+    on the spot when no ContactSystem ran. Colliders on LAYER_DEFAULT may be
+    either side, so their pairs are included as well and callers check the
+    components of what they got.
+    """
+    contacts = world.contacts
+    if contacts is None:
+        contacts = find_contacts(world)
+    pairs = layer_contacts(contacts, first, second)
+    if LAYER_DEFAULT not in (first, second):
+        general = layer_contacts(contacts, LAYER_DEFAULT, LAYER_DEFAULT)
+        pairs += layer_contacts(contacts, first, LAYER_DEFAULT)
+        pairs += general
+        # Within one layer every pair is listed once, the reversed terms would repeat it
+        if first != second:
+            pairs += layer_contacts(contacts, LAYER_DEFAULT, second)
+            pairs += [(b, a) for a, b in general]
+    return pairs
+
+def layer_contacts(contacts, first, second):
+    if first <= second:
+        return list(contacts.get((first, second), []))
+    return [(b, a) for a, b in contacts.get((second, first), [])]
+
+# Fill colours of the loot squares
+LOOT_COLORS = {"scrap": (128, 128, 128), "ore": (255, 165, 0), "xp": (0, 0, 255)}
+LOOT_SIZE = (15, 15)
+
+def pick_rock(meteor_images, size, atlas=None):
+    """Pick a random rock image at size, from the atlas when it has that rock packed."""
+    index = random.randrange(len(meteor_images))
+    if atlas is not None:
+        image = atlas.get(sized_name(f'rock{index}', size))
+        if image is not None:
+            return image
+    return assets.scale(meteor_images[index], size)
+
 class MovementSystem(System):
+    reads = (Velocity,)
+    writes = (Position,)
+
     def process(self, dt):
+        if self.world.columnar:
+            for archetype in self.world.query(Position, Velocity).archetypes:
+                x = archetype.array(Position, 'x')
+                y = archetype.array(Position, 'y')
+                archetype.array(Position, 'prev_x')[:] = x
+                archetype.array(Position, 'prev_y')[:] = y
+                x += archetype.array(Velocity, 'dx') * dt
+                y += archetype.array(Velocity, 'dy') * dt
+            return
+
         for entity_id, (position, velocity) in self.world.get_entities_with_components(Position, Velocity):
+            position.prev_x = position.x
+            position.prev_y = position.y
             position.x += velocity.dx * dt
             position.y += velocity.dy * dt
 
 class RotationSystem(System):
+    reads = ()
+    writes = (Rotation,)
+
     def process(self, dt):
+        if self.world.columnar:
+            for archetype in self.world.query(Rotation).archetypes:
+                angle = archetype.array(Rotation, 'angle')
+                angle += archetype.array(Rotation, 'speed') * dt
+                np.mod(angle, 360, out=angle)
+            return
+
         for entity_id, (rotation,) in self.world.get_entities_with_components(Rotation):
             rotation.angle = (rotation.angle + rotation.speed * dt) % 360
 
 class BackgroundSystem(System):
+    """Scrolls the parallax background in step with the simulation."""
+    reads = ()
+    writes = ()
+
+    def __init__(self, background=None):
+        super().__init__()
+        self.background = background
+
     def process(self, dt):
-        bg_entities = list(self.world.get_entities_with_components(Position, Sprite, Background))
-        if not bg_entities:
+        if self.background is not None:
+            self.background.scroll(dt)
+
+class RenderSystem(System):
+    def __init__(self, screen, rotation_cache=None, dirty=None, view=None, margin=RENDER_MARGIN, scale=1.0):
+        super().__init__()
+        self.screen = screen
+        # Screen pixels per world unit, below 1 when drawing to a smaller internal canvas
+        self.scale = scale
+        self.scaled_images = weakref.WeakKeyDictionary()
+        # Area of the world shown on screen; sprites entirely outside it (plus margin) are skipped
+        self.view = view if view is not None else pygame.Rect(0, 0, WIN_WIDTH, WIN_HEIGHT)
+        self.margin = margin
+        self.culled = 0
+        self.rotation_cache = rotation_cache if rotation_cache is not None else RotationCache()
+        # DirtyRects to record the drawn areas in, None when the whole screen is pushed every frame
+        self.dirty = dirty
+        # Sprites by layer, kept up to date by world observers instead of being gathered and sorted every frame
+        self.layers = {}
+        self.layer_order = []
+        self.entity_layers = {}
+        self.tracked_world = None
+        self.is_render_system = True
+
+    def track(self):
+        """Start keeping the layer buckets of self.world up to date."""
+        self.layers.clear()
+        self.layer_order.clear()
+        self.entity_layers.clear()
+        for component_type in (Position, Sprite, Rotation):
+            self.world.observe(component_type, self.refresh, self.refresh)
+        for entity_id, _ in self.world.query(Position, Sprite):
+            self.refresh(entity_id)
+        self.tracked_world = self.world
+
+    def refresh(self, entity_id, component=None):
+        """Put an entity into the bucket of its sprite's layer, or drop it if it is no longer drawable."""
+        layer = self.entity_layers.pop(entity_id, None)
+        if layer is not None:
+            del self.layers[layer][entity_id]
+        components = self.world.entities.get(entity_id)
+        if not components or Position not in components or Sprite not in components:
             return
+        sprite = components[Sprite]
+        bucket = self.layers.get(sprite.layer)
+        if bucket is None:
+            bucket = self.layers[sprite.layer] = {}
+            self.layer_order.append(sprite.layer)
+            self.layer_order.sort()
+        bucket[entity_id] = (components[Position], sprite, components.get(Rotation))
+        self.entity_layers[entity_id] = sprite.layer
 
-        # # Assuming all bg tiles have the same height
-        # bg_height = bg_entities[0][1][1].image.get_height()
-        # num_tiles = len(bg_entities)
-        
-        # for entity_id, (position, sprite, _) in bg_entities:
-        #     if position.y > WIN_HEIGHT + bg_height / 2:
-        #         position.y -= num_tiles * bg_height
+    def process(self):
+        if self.tracked_world is not self.world:
+            self.track()
+
+        # Blend between the last two simulation ticks
+        alpha = self.world.interpolation_alpha
+        rotate = self.rotation_cache.get
+        scale = self.scale
+        left = self.view.left - self.margin
+        top = self.view.top - self.margin
+        right = self.view.right + self.margin
+        bottom = self.view.bottom + self.margin
+        culled = 0
+        moved = []
+        for layer in self.layer_order:
+            bucket = self.layers[layer]
+            batch = []
+            for entity_id, (position, sprite, rotation) in bucket.items():
+                if sprite.layer != layer:
+                    moved.append(entity_id)
+                x = position.prev_x + (position.x - position.prev_x) * alpha
+                y = position.prev_y + (position.y - position.prev_y) * alpha
+                # Cull before rotating, a rotated sprite stays within the circle around its rect
+                width, height = sprite.rect.size
+                if rotation:
+                    half_width = half_height = hypot(width, height) / 2
+                else:
+                    half_width = width / 2
+                    half_height = height / 2
+                if x + half_width < left or x - half_width > right or y + half_height < top or y - half_height > bottom:
+                    culled += 1
+                    continue
+                if scale != 1.0:
+                    image = self.scaled_image(sprite.image)
+                    x *= scale
+                    y *= scale
+                    if rotation:
+                        image = rotate(image, rotation.angle)
+                    batch.append((image, image.get_rect(center=(x, y))))
+                elif rotation:
+                    rotated_image = rotate(sprite.image, rotation.angle)
+                    batch.append((rotated_image, rotated_image.get_rect(center=(x, y))))
+                else:
+                    sprite.rect.center = (x, y)
+                    batch.append((sprite.image, sprite.rect))
+            if not batch:
+                continue
+            if self.dirty is None:
+                self.screen.blits(batch, False)
+            else:
+                for drawn in self.screen.blits(batch):
+                    self.dirty.add(drawn)
+
+        self.culled = culled
+
+        # Sprites that changed layer are drawn in the old one this time and move for the next frame
+        for entity_id in moved:
+            self.refresh(entity_id)
+
+    def warm(self, images):
+        """Make the rotations of images ahead of time, at the render scale."""
+        if self.scale != 1.0:
+            images = [self.scaled_image(image) for image in images]
+        self.rotation_cache.warm(images)
+
+    def scaled_image(self, image):
+        """Get an image resized to the render scale, made once per source image."""
+        scaled = self.scaled_images.get(image)
+        if scaled is None:
+            width, height = image.get_size()
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            scaled = self.scaled_images[image] = pygame.transform.scale(image, size)
+        return scaled
+
+class ParticleSystem(System):
+    """Steps the particle field in one vectorized pass per tick."""
+    reads = ()
+    writes = (PARTICLES,)
+
+    def __init__(self, particles):
+        super().__init__()
+        self.particles = particles
 
-class RenderSystem(System):
-    def __init__(self, screen):
+    def process(self, dt):
+        self.particles.step(dt)
+
+class ParticleRenderSystem(System):
+    """Draws the particle field over the sprites."""
+    def __init__(self, screen, particles, dirty=None, scale=1.0):
         super().__init__()
         self.screen = screen
+        self.particles = particles
+        self.dirty = dirty
+        self.scale = scale
         self.is_render_system = True
 
     def process(self):
-        entities_to_render = []
-        for entity_id, (position, sprite) in self.world.get_entities_with_components(Position, Sprite):
-            entities_to_render.append((sprite.layer, position, sprite, self.world.get_component(entity_id, Rotation)))
+        drawn = self.particles.draw(self.screen, self.world.interpolation_alpha, self.scale, self.dirty is not None)
+        for rect in drawn:
+            self.dirty.add(rect)
 
-        entities_to_render.sort(key=lambda e: e[0])
+class UpscaleSystem(System):
+    """Stretches the internal render canvas over the whole screen."""
+    def __init__(self, canvas, screen):
+        super().__init__()
+        self.canvas = canvas
+        self.screen = screen
+        self.is_render_system = True
 
-        for layer, position, sprite, rotation in entities_to_render:
-            if rotation:
-                rotated_image = pygame.transform.rotate(sprite.image, rotation.angle)
-                rect = rotated_image.get_rect(center=(position.x, position.y))
-                self.screen.blit(rotated_image, rect)
-            else:
-                sprite.rect.center = (position.x, position.y)
-                self.screen.blit(sprite.image, sprite.rect)
+    def process(self):
+        pygame.transform.scale(self.canvas, self.screen.get_size(), self.screen)
 
 class PlayerControlSystem(System):
+    reads = (PlayerInput,)
+    writes = (Position, Velocity, Player)
+
+    def __init__(self, atlas=None):
+        super().__init__()
+        self.atlas = atlas
+        self.bullet_pool = EntityPool(self.new_bullet, self.reset_bullet)
+
     def process(self, dt):
         keystate = pygame.key.get_pressed()
         mousestate = pygame.mouse.get_pressed()
@@ -107,209 +429,211 @@ class PlayerControlSystem(System):
         # Simple cooldown
         if now - getattr(self, 'last_shot', 0) > player.fire_rate:
             self.last_shot = now
-            bullet_img = pygame.image.load(path.join(img_dir, "bullet.png")).convert_alpha()
-            bullet_img = pygame.transform.scale(bullet_img, player.bullet_size)
-            self.world.create_entity(
-                Position(x, y),
-                Velocity(dy=player.bullet_speed),
-                Sprite(bullet_img, bullet_img.get_rect(), layer=5),
-                Bullet(damage=player.bullet_damage),
-                Collision(5)
-            )
+            self.create_bullet(x, y, player)
+
+    def create_bullet(self, x, y, player):
+        return self.bullet_pool.spawn(self.world, x, y, player)
+
+    def new_bullet(self, x, y, player):
+        bullet_img = self.atlas.get(sized_name('bullet', player.bullet_size)) if self.atlas is not None else None
+        if bullet_img is None:
+            bullet_img = assets.get('bullet.png', player.bullet_size)
+        return [
+            Position(x, y),
+            Velocity(dy=player.bullet_speed),
+            Sprite(bullet_img, bullet_img.get_rect(), layer=5),
+            Bullet(damage=player.bullet_damage),
+            Collision(5, LAYER_BULLET, swept=True)
+        ]
+
+    def reset_bullet(self, components, x, y, player):
+        components[Position].place(x, y)
+        velocity = components[Velocity]
+        velocity.dx = 0.0
+        velocity.dy = player.bullet_speed
+        components[Bullet].damage = player.bullet_damage
+
+class ContactSystem(System):
+    """Publishes the frame's contacts in world.contacts for the systems that react to them."""
+    reads = (Position, Collision)
+    writes = (CONTACTS,)
+
+    def __init__(self, cell_size=128):
+        super().__init__()
+        self.cell_size = cell_size
+        # One broad phase grid per collision layer, reused between frames
+        self.grids = {}
+
+    def process(self, dt):
+        self.world.contacts = find_contacts(self.world, self.grids, self.cell_size)
 
 class CollisionSystem(System):
-    def __init__(self, explosion_anim, expl_sounds, meteor_images, hit_sounds):
+    reads = (Position, Collision, Bullet, PlayerInput, CONTACTS)
+    writes = (Velocity, Mob, Player, PARTICLES)
+
+    def __init__(self, explosion_anim, expl_sounds, meteor_images, hit_sounds, particles=None, atlas=None):
         super().__init__()
         self.explosion_anim = explosion_anim
         self.expl_sounds = expl_sounds
         self.meteor_images = meteor_images
         self.hit_sounds = hit_sounds
-        self.loot_sprites = {
-            "scrap": pygame.Surface((15, 15)),
-            "ore": pygame.Surface((15, 15)),
-            "xp": pygame.Surface((15, 15)),
-        }
-        self.loot_sprites["scrap"].fill((128, 128, 128))
-        self.loot_sprites["ore"].fill((255, 165, 0))
-        self.loot_sprites["xp"].fill((0, 0, 255))
+        self.atlas = atlas
+        self.loot_sprites = {}
+        for loot_type, color in LOOT_COLORS.items():
+            loot_sprite = atlas.get(f'loot_{loot_type}') if atlas is not None else None
+            if loot_sprite is None:
+                loot_sprite = pygame.Surface(LOOT_SIZE)
+                loot_sprite.fill(color)
+            self.loot_sprites[loot_type] = loot_sprite
         self.mob_types = {
-            'small': {'size': (30, 30), 'score': 20, 'health': 1},
-            'medium': {'size': (60, 60), 'score': 10, 'health': 3},
-            'large': {'size': (100, 100), 'score': 5, 'health': 5}
+            'small': {'size': MOB_SIZES['small'], 'score': 20, 'health': 1},
+            'medium': {'size': MOB_SIZES['medium'], 'score': 10, 'health': 3},
+            'large': {'size': MOB_SIZES['large'], 'score': 5, 'health': 5}
         }
+        # Short-lived entities are recycled instead of rebuilt on every hit
+        self.explosion_pool = EntityPool(self.new_explosion, self.reset_explosion)
+        # Hit sparks live in arrays, not in the entity system
+        self.particles = particles if particles is not None else ParticleField(PARTICLE_CAPACITY)
+        self.solver = ContactSolver(RESTITUTION, SOLVER_ITERATIONS, SLEEP_SPEED, SLEEP_FRAMES)
 
     def process(self, dt):
-        # A more specific collision detection
-        mobs = list(self.world.get_entities_with_components(Position, Collision, Mob, Velocity, Rotation))
-        bullets = list(self.world.get_entities_with_components(Position, Collision, Bullet))
-        players = list(self.world.get_entities_with_components(Position, Collision, PlayerInput))
-
         # Check for collisions between bullets and mobs
         bullets_to_remove = set() # Use a set for efficient lookups and to avoid duplicates
-        for bullet_id, (b_pos, b_col, bullet) in bullets:
-            for mob_id, (m_pos, m_col, mob, _, __) in mobs:
-                dist_sq = (b_pos.x - m_pos.x)**2 + (b_pos.y - m_pos.y)**2
-                if dist_sq < (b_col.radius + m_col.radius)**2:
-                    bullets_to_remove.add(bullet_id) # Add bullet to removal list
-                    mob.health -= bullet.damage
-                    channel = random.choice(self.hit_sounds).play()
-                    if channel:
-                        channel.set_volume(0.1)
-                    self.create_hit_particles(b_pos)
-                    if mob.health <= 0:
-                        if mob.type in ['large', 'medium'] and random.random() < 0.3:
-                            num_small_mobs = random.randint(2, 4)
-                            for _ in range(num_small_mobs):
-                                new_mob_type = 'small' if mob.type == 'medium' else 'medium'
-                                self.create_mob(new_mob_type, m_pos)
-
-                        self.world.remove_entity(mob_id)
-                        explosion_size = 'lg' if mob.type == 'large' else 'sm'
-                        self.create_explosion(m_pos, explosion_size)
-                        self.create_loot(m_pos)
+        for bullet_id, mob_id in get_contacts(self.world, LAYER_BULLET, LAYER_MOB):
+            bullet = self.world.get_component(bullet_id, Bullet)
+            mob = self.world.get_component(mob_id, Mob)
+            if not bullet or not mob:
+                continue
+            b_pos = self.world.get_component(bullet_id, Position)
+            m_pos = self.world.get_component(mob_id, Position)
+            bullets_to_remove.add(bullet_id) # Add bullet to removal list
+            mob.health -= bullet.damage
+            channel = random.choice(self.hit_sounds).play()
+            if channel:
+                channel.set_volume(0.1)
+            self.create_hit_particles(b_pos)
+            if mob.health <= 0:
+                if mob.type in ['large', 'medium'] and random.random() < 0.3:
+                    num_small_mobs = random.randint(2, 4)
+                    for _ in range(num_small_mobs):
+                        new_mob_type = 'small' if mob.type == 'medium' else 'medium'
+                        self.create_mob(new_mob_type, m_pos)
+
+                self.world.remove_entity(mob_id)
+                explosion_size = 'lg' if mob.type == 'large' else 'sm'
+                self.create_explosion(m_pos, explosion_size)
+                self.create_loot(m_pos)
 
         # Remove bullets after all collisions have been processed
         for bullet_id in bullets_to_remove:
             self.world.remove_entity(bullet_id)
 
         # Check for collisions between players and mobs
-        for player_id, (p_pos, p_col, _) in players:
+        player_contacts = []
+        for player_id, mob_id in get_contacts(self.world, LAYER_PLAYER, LAYER_MOB):
             player = self.world.get_component(player_id, Player)
-            player_velocity = self.world.get_component(player_id, Velocity)
-            if not player or not player_velocity:
+            mob = self.world.get_component(mob_id, Mob)
+            # Check if mob still exists
+            if not player or not mob or not self.has_velocity(player_id, mob_id):
                 continue
 
-            for mob_id, (m_pos, m_col, mob, m_vel, __) in mobs:
-                # Check if mob still exists
-                if self.world.get_component(mob_id, Mob):
-                    dist_sq = (p_pos.x - m_pos.x)**2 + (p_pos.y - m_pos.y)**2
-                    if dist_sq < (p_col.radius + m_col.radius)**2:
-                        # Damage calculation for player
-                        mob_damage_to_player = mob.health # Mob damage to player is its health
-                        
-                        if player.shield > 0:
-                            player.shield -= mob_damage_to_player
-                            if player.shield < 0:
-                                player.hull += player.shield # shield is negative, so this subtracts
-                                player.shield = 0
-                        else:
-                            player.hull -= mob_damage_to_player
-
-                        if player.hull <= 0:
-                            self.world.remove_entity(player_id)
-                            self.create_explosion(p_pos, 'lg') # bigger explosion for player
-
-                        # Collision resolution (similar to mob-mob collision)
-                        if dist_sq == 0:
-                            continue
-
-                        dx = p_pos.x - m_pos.x
-                        dy = p_pos.y - m_pos.y
-                        dist = (dist_sq)**0.5
-
-                        # Normalize the collision vector
-                        nx = dx / dist
-                        ny = dy / dist
-
-                        # Relative velocity
-                        rvx = player_velocity.dx - m_vel.dx
-                        rvy = player_velocity.dy - m_vel.dy
-
-                        # Velocity along the normal
-                        vel_along_normal = rvx * nx + rvy * ny
-
-                        # Do not resolve if velocities are separating
-                        if vel_along_normal > 0:
-                            continue
-                        
-                        # Coefficient of restitution (e.g., 0.8 for a somewhat bouncy collision)
-                        e = 0.8
-
-                        # Calculate impulse scalar
-                        impulse_scalar = -(1 + e) * vel_along_normal
-                        impulse_scalar /= (1 / player.mass) + (1 / mob.mass)
-
-                        # Apply impulse
-                        impulse_x = impulse_scalar * nx
-                        impulse_y = impulse_scalar * ny
-                        
-                        player_velocity.dx += impulse_x / player.mass
-                        player_velocity.dy += impulse_y / player.mass
-                        m_vel.dx -= impulse_x / mob.mass
-                        m_vel.dy -= impulse_y / mob.mass
-
-                        # Damage calculation for mob based on impulse and player mass
-                        player_collision_damage_factor = 0.1 # Adjust this value for desired damage
-                        mob.health -= abs(impulse_scalar) * player_collision_damage_factor
-                        
-                        if mob.health <= 0:
-                            self.world.remove_entity(mob_id)
-                            self.create_explosion(m_pos, 'sm')
-                            self.create_loot(m_pos)
+            # Damage calculation for player
+            mob_damage_to_player = mob.health # Mob damage to player is its health
+
+            if player.shield > 0:
+                player.shield -= mob_damage_to_player
+                if player.shield < 0:
+                    player.hull += player.shield # shield is negative, so this subtracts
+                    player.shield = 0
+            else:
+                player.hull -= mob_damage_to_player
+
+            if player.hull <= 0:
+                self.world.remove_entity(player_id)
+                self.create_explosion(self.world.get_component(player_id, Position), 'lg') # bigger explosion for player
+            player_contacts.append((player_id, player.mass, mob_id, mob))
 
         # Check for collisions between mobs
-        for i in range(len(mobs)):
-            for j in range(i + 1, len(mobs)):
-                mob1_id, (pos1, col1, mob1, vel1, rot1) = mobs[i]
-                mob2_id, (pos2, col2, mob2, vel2, rot2) = mobs[j]
-
-                dist_sq = (pos1.x - pos2.x)**2 + (pos1.y - pos2.y)**2
-                if dist_sq < (col1.radius + col2.radius)**2:
-                    # Collision detected, now handle the bounce
-                    dx = pos1.x - pos2.x
-                    dy = pos1.y - pos2.y
-                    dist = (dist_sq)**0.5
-                    
-                    if dist == 0:
-                        continue
-
-                    # Normalize the collision vector
-                    nx = dx / dist
-                    ny = dy / dist
-
-                    # Relative velocity
-                    rvx = vel1.dx - vel2.dx
-                    rvy = vel1.dy - vel2.dy
-
-                    # Velocity along the normal
-                    vel_along_normal = rvx * nx + rvy * ny
-
-                    # Do not resolve if velocities are separating
-                    if vel_along_normal > 0:
-                        continue
-                    
-                    # Coefficient of restitution (e.g., 0.8 for a somewhat bouncy collision)
-                    e = 0.8
-
-                    # Calculate impulse scalar
-                    impulse_scalar = -(1 + e) * vel_along_normal
-                    impulse_scalar /= (1 / mob1.mass) + (1 / mob2.mass)
-
-                    # Apply impulse
-                    impulse_x = impulse_scalar * nx
-                    impulse_y = impulse_scalar * ny
-                    vel1.dx += impulse_x / mob1.mass
-                    vel1.dy += impulse_y / mob1.mass
-                    vel2.dx -= impulse_x / mob2.mass
-                    vel2.dy -= impulse_y / mob2.mass
-
-                    # Angular impulse
-                    # For simplicity, we'll just apply a fraction of the impulse as torque
-                    # A more accurate model would involve cross products
-                    rot1.speed += (impulse_x * ny - impulse_y * nx) / rot1.inertia
-                    rot2.speed -= (impulse_x * ny - impulse_y * nx) / rot2.inertia
+        mob_contacts = []
+        for mob1_id, mob2_id in get_contacts(self.world, LAYER_MOB, LAYER_MOB):
+            mob1 = self.world.get_component(mob1_id, Mob)
+            mob2 = self.world.get_component(mob2_id, Mob)
+            if mob1 and mob2 and self.has_velocity(mob1_id, mob2_id):
+                mob_contacts.append((mob1_id, mob1.mass, mob2_id, mob2))
+
+        # Bounce everything touching in one batch
+        impulses = self.resolve(player_contacts + mob_contacts)
+
+        # Damage calculation for mob based on impulse and player mass
+        player_collision_damage_factor = 0.1 # Adjust this value for desired damage
+        for (_, __, mob_id, mob), impulse in zip(player_contacts, impulses.tolist()):
+            mob.health -= impulse * player_collision_damage_factor
+            if mob.health <= 0:
+                m_pos = self.world.get_component(mob_id, Position)
+                self.world.remove_entity(mob_id)
+                self.create_explosion(m_pos, 'sm')
+                self.create_loot(m_pos)
+
+    def has_velocity(self, *entity_ids):
+        return all(self.world.get_component(entity_id, Velocity) for entity_id in entity_ids)
+
+    def resolve(self, contacts):
+        """Solve (first id, first mass, mob id, mob) contacts and get the impulse of each."""
+        bodies = {}
+        masses = []
+        sleepy = []
+        pairs_a = []
+        pairs_b = []
+        for first_id, first_mass, mob_id, mob in contacts:
+            for entity_id, mass in ((first_id, first_mass), (mob_id, mob.mass)):
+                if entity_id not in bodies:
+                    bodies[entity_id] = len(masses)
+                    masses.append(mass)
+                    # Only rocks rest, the player is always steered
+                    sleepy.append(self.world.get_component(entity_id, Mob) is not None)
+            pairs_a.append(bodies[first_id])
+            pairs_b.append(bodies[mob_id])
+
+        keys = list(bodies)
+        positions = [self.world.get_component(entity_id, Position) for entity_id in keys]
+        velocities = [self.world.get_component(entity_id, Velocity) for entity_id in keys]
+        x = np.array([position.x for position in positions], dtype=float)
+        y = np.array([position.y for position in positions], dtype=float)
+        vx, vy, impulses = self.solver.solve(
+            keys, x, y,
+            [velocity.dx for velocity in velocities], [velocity.dy for velocity in velocities],
+            1.0 / np.array(masses, dtype=float), pairs_a, pairs_b, sleepy)
+        for velocity, dx, dy in zip(velocities, vx.tolist(), vy.tolist()):
+            velocity.dx = dx
+            velocity.dy = dy
+        return impulses
 
     def create_explosion(self, position, size):
         channel = random.choice(self.expl_sounds).play()
         if channel:
             channel.set_volume(0.08)
+        self.explosion_pool.spawn(self.world, position, size)
+
+    def new_explosion(self, position, size):
         anim = self.explosion_anim[size]
-        self.world.create_entity(
+        return [
             Position(position.x, position.y),
             Sprite(anim[0], anim[0].get_rect(), layer=3),
             Animation(frames=anim, speed=50),
             Lifetime(time_to_live=len(anim) * 50)
-        )
+        ]
+
+    def reset_explosion(self, components, position, size):
+        anim = self.explosion_anim[size]
+        components[Position].place(position.x, position.y)
+        sprite = components[Sprite]
+        sprite.image = anim[0]
+        sprite.rect.size = anim[0].get_size()
+        animation = components[Animation]
+        animation.frames = anim
+        animation.current_frame = 0
+        animation.last_update = 0
+        components[Lifetime].time_to_live = len(anim) * 50
 
     def create_loot(self, position):
         loot_type = random.choice(["scrap", "ore", "xp"])
@@ -320,13 +644,12 @@ class CollisionSystem(System):
             Velocity(dx=random.uniform(-0.1, 0.1), dy=random.uniform(-0.1, 0.1)),
             Sprite(loot_sprite, loot_sprite.get_rect(), layer=3),
             Loot(type=loot_type, value=loot_value),
-            Collision(10)
+            Collision(10, LAYER_LOOT)
         )
 
     def create_mob(self, mob_type, position):
         mob_info = self.mob_types[mob_type]
-        mob_img = random.choice(self.meteor_images)
-        mob_img = pygame.transform.scale(mob_img, mob_info['size'])
+        mob_img = pick_rock(self.meteor_images, mob_info['size'], self.atlas)
         
         mass = (mob_info['size'][0] * mob_info['size'][1]) / 100.0
         radius = int(mob_img.get_rect().width * .85 / 2)
@@ -337,23 +660,17 @@ class CollisionSystem(System):
             Velocity(dx=random.uniform(-0.2, 0.2), dy=random.uniform(-0.2, 0.2)),
             Sprite(mob_img, mob_img.get_rect(), layer=3),
             Mob(type=mob_type, health=mob_info['health'], mass=mass),
-            Collision(radius),
+            Collision(radius, LAYER_MOB),
             Rotation(speed=random.uniform(-0.1, 0.1), inertia=inertia)
         )
 
     def create_hit_particles(self, position):
-        particle_count = random.randint(3, 7)
-        for _ in range(particle_count):
-            particle_surface = pygame.Surface((3, 3))
-            particle_surface.fill((128, 128, 128))
-            self.world.create_entity(
-                Position(position.x, position.y),
-                Velocity(dx=random.uniform(-0.3, 0.3), dy=random.uniform(-0.3, 0.3)),
-                Sprite(particle_surface, particle_surface.get_rect(), layer=3),
-                Lifetime(time_to_live=random.randint(100, 300))
-            )
+        self.particles.emit(position.x, position.y, random.randint(3, 7))
 
 class AnimationSystem(System):
+    reads = ()
+    writes = (Sprite, Animation)
+
     def process(self, dt):
         for entity_id, (sprite, animation) in self.world.get_entities_with_components(Sprite, Animation):
             now = pygame.time.get_ticks()
@@ -363,39 +680,54 @@ class AnimationSystem(System):
                 sprite.image = animation.frames[animation.current_frame]
 
 class LifetimeSystem(System):
+    reads = ()
+    writes = (Lifetime,)
+
     def process(self, dt):
+        if self.world.columnar:
+            for archetype in self.world.query(Lifetime).archetypes:
+                time_to_live = archetype.array(Lifetime, 'time_to_live')
+                time_to_live -= dt
+                for row in np.flatnonzero(time_to_live <= 0):
+                    self.world.remove_entity(archetype.entity_ids[row])
+            return
+
         for entity_id, (lifetime,) in self.world.get_entities_with_components(Lifetime):
             lifetime.time_to_live -= dt
             if lifetime.time_to_live <= 0:
                 self.world.remove_entity(entity_id)
 
 class BoundarySystem(System):
+    reads = (Position, Mob, Bullet)
+    writes = ()
+
     def process(self, dt):
-        for entity_id, (position,) in self.world.get_entities_with_components(Position):
-            # Check for mobs and bullets going off-screen
-            is_mob = self.world.get_component(entity_id, Mob)
-            is_bullet = self.world.get_component(entity_id, Bullet)
-
-            if is_mob:
-                if position.y > WIN_HEIGHT + 20 or position.x < -25 or position.x > WIN_WIDTH + 20:
-                    self.world.remove_entity(entity_id)
-            elif is_bullet:
-                if position.y < -10:
-                    self.world.remove_entity(entity_id)
+        # Check for mobs and bullets going off-screen
+        for entity_id, (position, _) in self.world.get_entities_with_components(Position, Mob):
+            if position.y > WIN_HEIGHT + 20 or position.x < -25 or position.x > WIN_WIDTH + 20:
+                self.world.remove_entity(entity_id)
+
+        for entity_id, (position, _) in self.world.get_entities_with_components(Position, Bullet):
+            if position.y < -10:
+                self.world.remove_entity(entity_id)
 
 class MobSpawningSystem(System):
-    def __init__(self, meteor_images):
+    reads = (Mob,)
+    writes = ()
+
+    def __init__(self, meteor_images, atlas=None):
         super().__init__()
         self.meteor_images = meteor_images
+        self.atlas = atlas
         self.min_mobs = 10
         self.mob_types = {
-            'small': {'size': (30, 30), 'score': 20, 'health': 1},
-            'medium': {'size': (60, 60), 'score': 10, 'health': 3},
-            'large': {'size': (100, 100), 'score': 5, 'health': 5}
+            'small': {'size': MOB_SIZES['small'], 'score': 20, 'health': 1},
+            'medium': {'size': MOB_SIZES['medium'], 'score': 10, 'health': 3},
+            'large': {'size': MOB_SIZES['large'], 'score': 5, 'health': 5}
         }
 
     def process(self, dt):
-        mob_count = len(list(self.world.get_entities_with_components(Mob)))
+        mob_count = self.world.query(Mob).count()
         if mob_count < self.min_mobs:
             for _ in range(self.min_mobs - mob_count):
                 self.create_mob()
@@ -404,8 +736,7 @@ class MobSpawningSystem(System):
         if mob_type is None:
             mob_type = random.choice(list(self.mob_types.keys()))
         mob_info = self.mob_types[mob_type]
-        mob_img = random.choice(self.meteor_images)
-        mob_img = pygame.transform.scale(mob_img, mob_info['size'])
+        mob_img = pick_rock(self.meteor_images, mob_info['size'], self.atlas)
         
         mass = (mob_info['size'][0] * mob_info['size'][1]) / 100.0
         radius = int(mob_img.get_rect().width * .85 / 2)
@@ -419,49 +750,63 @@ class MobSpawningSystem(System):
             Velocity(dx=random.randrange(-2, 2) / 20, dy=random.randrange(1, 6) / 20),
             Sprite(mob_img, mob_img.get_rect(), layer=3),
             Mob(type=mob_type, health=mob_info['health'], mass=mass),
-            Collision(radius),
+            Collision(radius, LAYER_MOB),
             Rotation(speed=random.randrange(-2, 3) / 10.0, inertia=inertia)
         )
 
 class LootSystem(System):
+    reads = (Position, Collision, PlayerInput, Loot, CONTACTS)
+    writes = (GameState,)
+
     def process(self, dt):
-        players = list(self.world.get_entities_with_components(Position, Collision, PlayerInput))
-        loots = list(self.world.get_entities_with_components(Position, Collision, Loot))
-
-        for player_id, (p_pos, p_col, _) in players:
-            for loot_id, (l_pos, l_col, loot) in loots:
-                dist_sq = (p_pos.x - l_pos.x)**2 + (p_pos.y - l_pos.y)**2
-                if dist_sq < (p_col.radius + l_col.radius)**2:
-                    self.world.remove_entity(loot_id)
-                    for _, (game_state,) in self.world.get_entities_with_components(GameState):
-                        game_state.score += loot.value
-                        if loot.type == "scrap":
-                            game_state.scrap += 1
-                        elif loot.type == "ore":
-                            game_state.ore += 1
-                        elif loot.type == "xp":
-                            game_state.xp += 1
+        for player_id, loot_id in get_contacts(self.world, LAYER_PLAYER, LAYER_LOOT):
+            loot = self.world.get_component(loot_id, Loot)
+            if not loot or not self.world.get_component(player_id, PlayerInput):
+                continue
+            self.world.remove_entity(loot_id)
+            for _, (game_state,) in self.world.get_entities_with_components(GameState):
+                game_state.score += loot.value
+                if loot.type == "scrap":
+                    game_state.scrap += 1
+                elif loot.type == "ore":
+                    game_state.ore += 1
+                elif loot.type == "xp":
+                    game_state.xp += 1
 
 class UISystem(System):
-    def __init__(self, screen):
+    def __init__(self, screen, dirty=None):
         super().__init__()
         self.screen = screen
-        self.font = pygame.font.Font(None, 36)
+        self.font = get_font(None, 36)
+        self.dirty = dirty
+        # Last value and rendered line of each HUD counter
+        self.labels = {}
         self.is_render_system = True
 
+    def mark(self, rect):
+        if self.dirty is not None:
+            self.dirty.add(rect)
+
+    def label(self, name, value, color):
+        """Get the rendered HUD line of a counter, rendering it again only when its value changed."""
+        cached = self.labels.get(name)
+        if cached is None or cached[0] != value:
+            cached = self.labels[name] = (value, text_cache.render(self.font, f"{name}: {value}", color))
+        return cached[1]
+
     def process(self):
         for _, (game_state,) in self.world.get_entities_with_components(GameState):
-            score_text = self.font.render(f"Score: {game_state.score}", True, (255, 255, 255))
-            self.screen.blit(score_text, (10, 10))
+            score_text = self.label("Score", game_state.score, (255, 255, 255))
+            self.mark(self.screen.blit(score_text, (10, 10)))
 
-            scrap_text = self.font.render(f"Scrap: {game_state.scrap}", True, (128, 128, 128))
-            self.screen.blit(scrap_text, (10, 50))
+            scrap_text = self.label("Scrap", game_state.scrap, (128, 128, 128))
+            self.mark(self.screen.blit(scrap_text, (10, 50)))
 
-            ore_text = self.font.render(f"Ore: {game_state.ore}", True, (255, 165, 0))
-            self.screen.blit(ore_text, (10, 90))
+            ore_text = self.label("Ore", game_state.ore, (255, 165, 0))
+            self.mark(self.screen.blit(ore_text, (10, 90)))
 
-            xp_text = self.font.render(f"XP: {game_state.xp}", True, (0, 0, 255))
-            self.screen.blit(xp_text, (10, 130))
+            xp_text = self.label("XP", game_state.xp, (0, 0, 255))
+            self.mark(self.screen.blit(xp_text, (10, 130)))
 
         player_entities = list(self.world.get_entities_with_components(Player))
         if player_entities:
@@ -477,8 +822,8 @@ class UISystem(System):
                 fill = shield_pct * shield_bar_length
                 outline_rect = pygame.Rect(shield_bar_x, shield_bar_y, shield_bar_length, shield_bar_height)
                 fill_rect = pygame.Rect(shield_bar_x, shield_bar_y, fill, shield_bar_height)
-                pygame.draw.rect(self.screen, (0, 128, 255), fill_rect)
-                pygame.draw.rect(self.screen, (255, 255, 255), outline_rect, 2)
+                self.mark(pygame.draw.rect(self.screen, (0, 128, 255), fill_rect))
+                self.mark(pygame.draw.rect(self.screen, (255, 255, 255), outline_rect, 2))
 
             # Hull bar
             if player.hull > 0:
@@ -490,5 +835,5 @@ class UISystem(System):
                 fill = hull_pct * hull_bar_length
                 outline_rect = pygame.Rect(hull_bar_x, hull_bar_y, hull_bar_length, hull_bar_height)
                 fill_rect = pygame.Rect(hull_bar_x, hull_bar_y, fill, hull_bar_height)
-                pygame.draw.rect(self.screen, (0, 255, 0), fill_rect)
-                pygame.draw.rect(self.screen, (255, 255, 255), outline_rect, 2)
\ No newline at end of file
+                self.mark(pygame.draw.rect(self.screen, (0, 255, 0), fill_rect))
+                self.mark(pygame.draw.rect(self.screen, (255, 255, 255), outline_rect, 2))
\ No newline at end of file
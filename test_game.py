@@ -13,7 +13,9 @@ pygame.time.Clock = Mock(return_value=Mock(tick=Mock(return_value=16))) # Simula
 pygame.mixer = Mock()
 pygame.mixer.music = Mock()
 pygame.image = Mock()
-pygame.image.load = Mock(return_value=Mock(convert=Mock(), get_rect=Mock(), convert_alpha=Mock(return_value=Mock())))
+# Loaded images report a size, so the shared asset cache can account for them
+loaded_image = Mock(get_size=Mock(return_value=(1920, 1080)), get_bytesize=Mock(return_value=4))
+pygame.image.load = Mock(return_value=Mock(convert=Mock(return_value=loaded_image), get_rect=Mock(), convert_alpha=Mock(return_value=loaded_image)))
 pygame.font = Mock()
 pygame.font.init = Mock()
 pygame.font.Font = Mock(return_value=Mock())
@@ -25,15 +27,23 @@ sys.modules['pygame_gui.elements'] = MagicMock()
 sys.modules['pygame_gui.elements.UIButton'] = MagicMock()
 sys.modules['pygame_gui.UIManager'] = MagicMock()
 
-from ecs import World, Component, System
+from ecs import World, Component, System, Scheduler, EntityPool
 from game import Game
 from mainmenu import Main_menu
 from scrollex import ScrollexGame
 from gameover import GameOver
 from components import Mob, Player, Position, Velocity, Rotation, Lifetime, GameState, Bullet, Collision, Loot, PlayerInput, Sprite
-from systems import MovementSystem, RotationSystem, PlayerControlSystem, CollisionSystem, LifetimeSystem, LootSystem, RenderSystem
-from utils import Button, draw_text, WIN_WIDTH, WIN_HEIGHT, BLACK, WHITE, img_dir, path
+from systems import MovementSystem, RotationSystem, PlayerControlSystem, ContactSystem, CollisionSystem, LifetimeSystem, LootSystem, RenderSystem, BoundarySystem, MobSpawningSystem, ParticleSystem, get_contacts
+from utils import AssetManager, Button, DirtyRects, RotationCache, TextCache, draw_text, WIN_WIDTH, WIN_HEIGHT, BLACK, WHITE, img_dir, path
 from pausemenu import Pause_menu
+from background import ParallaxBackground, ScrollLayer, blit_wrapped, prepare_layer
+from spatial import SpatialHash, narrow_phase, swept_phase
+from solver import ContactSolver, find_islands
+from particles import ParticleField
+from atlas import TextureAtlas, sized_name
+from gameconst import LAYER_PLAYER, LAYER_MOB, LAYER_BULLET, LAYER_LOOT, LAYER_EFFECT
+import numpy as np
+import bench
 
 # --- ECS Tests ---
 
@@ -92,6 +102,125 @@ class TestECS(unittest.TestCase):
         self.assertIn((e1, [self.world.get_component(e1, Position), self.world.get_component(e1, Velocity)]), entities_with_pos_vel)
         self.assertIn((e3, [self.world.get_component(e3, Position), self.world.get_component(e3, Velocity)]), entities_with_pos_vel)
 
+    def test_entities_grouped_by_archetype(self):
+        e1 = self.world.create_entity(Position(0, 0), Velocity(1, 1))
+        e2 = self.world.create_entity(Position(10, 10), Velocity(2, 2))
+        e3 = self.world.create_entity(Position(20, 20))
+        self.assertIs(self.world.get_archetype(e1), self.world.get_archetype(e2))
+        self.assertIsNot(self.world.get_archetype(e1), self.world.get_archetype(e3))
+        self.assertEqual(len(self.world.archetypes), 2)
+
+    def test_add_and_remove_component_moves_archetype(self):
+        entity_id = self.world.create_entity(Position(0, 0))
+        vel = Velocity(1, 1)
+        self.world.add_component(entity_id, vel)
+        self.assertEqual(list(self.world.get_entities_with_components(Velocity)), [(entity_id, [vel])])
+        self.world.remove_component(entity_id, Velocity)
+        self.assertEqual(list(self.world.get_entities_with_components(Velocity)), [])
+        self.assertEqual(len(list(self.world.get_entities_with_components(Position))), 1)
+
+    def test_removed_entity_leaves_archetype(self):
+        e1 = self.world.create_entity(Position(0, 0))
+        e2 = self.world.create_entity(Position(1, 1))
+        e3 = self.world.create_entity(Position(2, 2))
+        self.world.remove_entity(e1)
+        self.world.cleanup_entities()
+        ids = sorted(entity_id for entity_id, _ in self.world.get_entities_with_components(Position))
+        self.assertEqual(ids, [e2, e3])
+        self.assertEqual(self.world.get_component(e3, Position).x, 2)
+
+    def test_component_index_tracks_changes(self):
+        e1 = self.world.create_entity(Position(0, 0))
+        e2 = self.world.create_entity(Position(1, 1), Velocity())
+        self.assertEqual(self.world.component_index[Position], {e1, e2})
+        self.world.add_component(e1, Velocity())
+        self.world.remove_component(e2, Position)
+        self.assertEqual(self.world.component_index[Position], {e1})
+        self.assertEqual(self.world.component_index[Velocity], {e1, e2})
+        self.world.remove_entity(e1)
+        self.world.cleanup_entities()
+        self.assertEqual(self.world.component_index[Velocity], {e2})
+
+    def test_cached_query_is_maintained(self):
+        self.world.create_entity(Position(0, 0), Velocity())
+        query = self.world.query(Position, Velocity)
+        self.assertIs(self.world.query(Position, Velocity), query)
+        self.assertEqual(query.count(), 1)
+        e2 = self.world.create_entity(Position(1, 1))
+        self.assertEqual(query.count(), 1)
+        self.world.add_component(e2, Velocity())
+        self.assertEqual(query.count(), 2)
+        self.world.remove_entity(e2)
+        self.world.cleanup_entities()
+        self.assertEqual(query.count(), 1)
+        self.world.clear_all_entities()
+        self.assertEqual(query.count(), 0)
+        self.assertEqual(list(query), [])
+
+    def test_entity_slots_are_reused_with_new_generation(self):
+        old_id = self.world.create_entity(Position(0, 0))
+        self.world.remove_entity(old_id)
+        self.world.cleanup_entities()
+        new_id = self.world.create_entity(Velocity())
+        self.assertNotEqual(new_id, old_id)
+        self.assertEqual(len(self.world.entities.components), 1) # Slot reused
+        self.assertFalse(self.world.is_alive(old_id))
+        self.assertTrue(self.world.is_alive(new_id))
+        self.assertNotIn(old_id, self.world.entities)
+        self.assertIsNone(self.world.get_component(old_id, Velocity))
+
+    def test_stale_handle_removal_is_ignored(self):
+        old_id = self.world.create_entity(Position(0, 0))
+        self.world.remove_entity(old_id)
+        self.world.cleanup_entities()
+        new_id = self.world.create_entity(Position(1, 1))
+        self.world.remove_entity(old_id)
+        self.world.cleanup_entities()
+        self.assertTrue(self.world.is_alive(new_id))
+        self.assertEqual(len(self.world.entities), 1)
+
+    def test_deferred_changes_apply_at_cleanup(self):
+        existing_id = self.world.create_entity(Position(0, 0))
+        self.world.defer_changes = True
+        new_id = self.world.create_entity(Position(1, 1))
+        self.world.add_component(existing_id, Velocity())
+        self.world.remove_component(existing_id, Position)
+        self.assertEqual(len(self.world.commands), 3)
+        self.assertEqual(self.world.query(Position).count(), 1)
+        self.assertIsNone(self.world.get_component(existing_id, Velocity))
+        self.world.defer_changes = False
+        self.world.cleanup_entities()
+        self.assertEqual([entity_id for entity_id, _ in self.world.get_entities_with_components(Position)], [new_id])
+        self.assertIsNotNone(self.world.get_component(existing_id, Velocity))
+        self.assertEqual(len(self.world.commands), 0)
+
+    def test_process_update_defers_created_entities(self):
+        class SpawnSystem(System):
+            def process(self, dt):
+                for entity_id, (position,) in self.world.get_entities_with_components(Position):
+                    self.world.create_entity(Position(position.x + 1, 0))
+        self.world.create_entity(Position(0, 0))
+        self.world.add_system(SpawnSystem())
+        self.world.process_update(16)
+        self.assertEqual(self.world.query(Position).count(), 2)
+        self.world.process_update(16)
+        self.assertEqual(self.world.query(Position).count(), 4)
+
+    def test_columnar_components_are_views(self):
+        world = World(columnar=True)
+        pos = Position(1, 2)
+        e1 = world.create_entity(pos, Velocity(3, 4))
+        e2 = world.create_entity(Position(5, 6), Velocity())
+        archetype = world.get_archetype(e1)
+        self.assertEqual(list(archetype.array(Position, 'x')), [1, 5])
+        pos.x = 10
+        self.assertEqual(archetype.array(Position, 'x')[0], 10)
+        world.remove_entity(e1)
+        world.cleanup_entities()
+        self.assertEqual((pos.x, pos.y), (10, 2)) # Detached component keeps its values
+        self.assertEqual(world.get_component(e2, Position), Position(5, 6))
+        self.assertEqual(list(archetype.array(Position, 'x')), [5])
+
     def test_add_system(self):
         system = MovementSystem()
         self.world.add_system(system)
@@ -122,6 +251,100 @@ class TestECS(unittest.TestCase):
             self.world.process_update()
             mock_process.assert_not_called()
 
+    def test_observers_see_attach_and_detach(self):
+        events = []
+        self.world.observe(Position, lambda eid, c: events.append(('add', eid, c.x)),
+                           lambda eid, c: events.append(('remove', eid, c.x)))
+        entity_id = self.world.create_entity(Position(1, 0), Velocity())
+        self.world.add_component(entity_id, Position(2, 0))
+        self.world.remove_component(entity_id, Position)
+        self.world.add_component(entity_id, Position(3, 0))
+        self.world.remove_entity(entity_id)
+        self.world.cleanup_entities()
+        self.assertEqual(events, [('add', entity_id, 1), ('remove', entity_id, 1), ('add', entity_id, 2),
+                                  ('remove', entity_id, 2), ('add', entity_id, 3), ('remove', entity_id, 3)])
+
+class TestEntityPool(unittest.TestCase):
+    def setUp(self):
+        self.world = World(columnar=True)
+        self.pool = EntityPool(lambda x: [Position(x, 0), Lifetime(time_to_live=0)], self.reset)
+
+    def reset(self, components, x):
+        components[Position].place(x, 0)
+        components[Lifetime].time_to_live = 100
+
+    def test_components_are_recycled(self):
+        first_id = self.pool.spawn(self.world, 5)
+        position = self.world.get_component(first_id, Position)
+        self.assertEqual(self.world.get_component(first_id, Lifetime).time_to_live, 100)
+        self.world.remove_entity(first_id)
+        self.world.cleanup_entities()
+        self.assertEqual(len(self.pool), 1)
+        second_id = self.pool.spawn(self.world, 7)
+        self.assertIs(self.world.get_component(second_id, Position), position)
+        self.assertEqual((position.x, position.prev_x), (7, 7))
+        self.assertEqual(len(self.pool), 0)
+
+    def test_changed_entities_are_not_recycled(self):
+        entity_id = self.pool.spawn(self.world, 5)
+        self.world.add_component(entity_id, Velocity())
+        self.world.remove_entity(entity_id)
+        self.world.cleanup_entities()
+        self.assertEqual(len(self.pool), 0)
+
+class TestScheduler(unittest.TestCase):
+    def test_build_stages(self):
+        movement = MovementSystem()
+        rotation = RotationSystem()
+        lifetime = LifetimeSystem()
+        collision = CollisionSystem({}, [], [], [])
+        undeclared = System()
+        scheduler = Scheduler(2)
+        self.addCleanup(scheduler.shutdown)
+        stages = scheduler.build_stages([movement, rotation, lifetime, collision, undeclared, lifetime])
+        self.assertEqual(stages, [[movement, rotation, lifetime], [collision], [undeclared], [lifetime]])
+
+    def test_process_update_with_scheduler(self):
+        world = World(columnar=True)
+        world.scheduler = Scheduler(2)
+        self.addCleanup(world.scheduler.shutdown)
+        world.add_system(MovementSystem())
+        world.add_system(RotationSystem())
+        world.add_system(LifetimeSystem())
+        pos = Position(0, 0)
+        rot = Rotation(speed=0.1)
+        expiring_id = world.create_entity(pos, Velocity(1, 1), rot, Lifetime(time_to_live=10))
+        world.process_update(16)
+        self.assertEqual((pos.x, pos.y), (16, 16))
+        self.assertAlmostEqual(rot.angle, 1.6)
+        self.assertNotIn(expiring_id, world.entities)
+
+class TestProfiler(unittest.TestCase):
+    def test_profiling_records_systems_and_queries(self):
+        world = World()
+        world.add_system(MovementSystem())
+        world.add_system(LifetimeSystem())
+        world.create_entity(Position(0, 0), Velocity(1, 1))
+        profiler = world.enable_profiling(window=10)
+        for _ in range(3):
+            world.process_update(16)
+            world.process_update(16)
+            world.process_render()
+        report = profiler.report()
+        self.assertEqual(set(report), {'MovementSystem', 'LifetimeSystem'})
+        self.assertEqual(report['MovementSystem']['calls'], 2)
+        self.assertEqual(report['MovementSystem']['total_calls'], 6)
+        self.assertGreaterEqual(report['MovementSystem']['p99'], report['MovementSystem']['p50'])
+        self.assertEqual(profiler.query_report()[('Position', 'Velocity')], 1)
+        self.assertEqual(profiler.frames, 3)
+
+    def test_profiling_disabled_by_default(self):
+        world = World()
+        self.assertIsNone(world.profiler)
+        world.enable_profiling()
+        world.disable_profiling()
+        self.assertIsNone(world.profiler)
+
 # --- Game Tests ---
 
 class TestGame(unittest.TestCase):
@@ -136,6 +359,17 @@ class TestGame(unittest.TestCase):
         self.assertIsNone(self.game.active)
         self.assertEqual(self.game.parent, self.game)
 
+    def test_new_game_shuts_down_old_scheduler(self):
+        old = ScrollexGame(self.mock_screen)
+        scheduler = old.world.scheduler = Scheduler(2)
+        self.game.add(old)
+        with patch.object(ScrollexGame, 'init'):
+            self.game.start(ScrollexGame, new_game=True)
+        self.assertIsNot(self.game.active, old)
+        self.assertIsNone(old.world.scheduler)
+        with self.assertRaises(RuntimeError): # the pool no longer takes work
+            scheduler.executor.submit(print)
+
     def test_set_pause(self):
         self.game.SetPause(True)
         self.assertFalse(self.game.running)
@@ -191,6 +425,17 @@ class TestGame(unittest.TestCase):
         mock_child_game.draw.assert_called_once()
         pygame.display.flip.assert_called_once()
 
+    @patch.object(pygame.display, 'update')
+    @patch.object(pygame.display, 'flip')
+    def test_draw_pushes_dirty_rects_only(self, mock_flip, mock_update):
+        child = Mock()
+        child.running = True
+        child.get_dirty_rects = Mock(return_value=[pygame.Rect(0, 0, 5, 5)])
+        self.game.active = child
+        self.game.draw()
+        mock_update.assert_called_once_with([pygame.Rect(0, 0, 5, 5)])
+        mock_flip.assert_not_called()
+
 # --- Main_menu Tests ---
 
 class TestMainMenu(unittest.TestCase):
@@ -490,6 +735,24 @@ class TestMovementSystem(unittest.TestCase):
         self.assertEqual(pos.x, 1000)
         self.assertEqual(pos.y, 2000)
 
+    def test_process_columnar_world(self):
+        world = World(columnar=True)
+        world.add_system(self.movement_system)
+        pos = Position(0, 0)
+        world.create_entity(pos, Velocity(1, 2))
+        world.create_entity(Position(5, 5), Velocity(1, 1), Rotation())
+        self.movement_system.process(1000)
+        self.assertEqual((pos.x, pos.y), (1000, 2000))
+        self.assertEqual((pos.prev_x, pos.prev_y), (0, 0))
+
+    def test_process_stores_previous_position(self):
+        pos = Position(5, 5)
+        self.world.create_entity(pos, Velocity(1, 0))
+        self.movement_system.process(10)
+        self.movement_system.process(10)
+        self.assertEqual((pos.prev_x, pos.prev_y), (15, 5))
+        self.assertEqual((pos.x, pos.y), (25, 5))
+
 class TestRotationSystem(unittest.TestCase):
     def setUp(self):
         self.world = World()
@@ -508,6 +771,365 @@ class TestRotationSystem(unittest.TestCase):
         self.rotation_system.process(200) # dt = 200ms, 350 + 20 = 370, should be 10
         self.assertEqual(rot.angle, 10.0)
 
+    def test_process_columnar_world(self):
+        world = World(columnar=True)
+        world.add_system(self.rotation_system)
+        rot = Rotation(angle=350, speed=0.1)
+        world.create_entity(rot)
+        self.rotation_system.process(200)
+        self.assertAlmostEqual(rot.angle, 10.0)
+
+class TestRenderSystem(unittest.TestCase):
+    def setUp(self):
+        self.world = World()
+        self.screen = Mock()
+        self.render_system = RenderSystem(self.screen)
+        self.world.add_system(self.render_system)
+
+    def test_interpolates_between_ticks(self):
+        image = pygame.Surface((10, 10))
+        self.world.create_entity(Position(20, 40, prev_x=10, prev_y=20), Sprite(image, image.get_rect()))
+        self.world.interpolation_alpha = 0.5
+        self.render_system.process()
+        [(blitted_image, rect)] = self.screen.blits.call_args[0][0]
+        self.assertIs(blitted_image, image)
+        self.assertEqual(rect.center, (15, 30))
+
+    def test_rotated_sprites_come_from_cache(self):
+        image = pygame.Surface((10, 20))
+        self.world.create_entity(Position(0, 0), Sprite(image, image.get_rect()), Rotation(angle=90))
+        self.render_system.process()
+        self.render_system.process()
+        cache = self.render_system.rotation_cache
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        [(blitted_image, rect)] = self.screen.blits.call_args[0][0]
+        self.assertEqual(blitted_image.get_size(), (20, 10))
+
+    def test_layers_are_drawn_in_order_and_kept_up_to_date(self):
+        images = [pygame.Surface((1, 1)) for _ in range(3)]
+        top = self.world.create_entity(Position(0, 0), Sprite(images[2], images[2].get_rect(), layer=5))
+        self.world.create_entity(Position(0, 0), Sprite(images[0], images[0].get_rect(), layer=1))
+        self.render_system.process()
+        drawn = [batch[0][0][0] for batch, _ in self.screen.blits.call_args_list]
+        self.assertEqual(drawn, [images[0], images[2]])
+
+        # Created after tracking started, on a layer in between
+        middle = self.world.create_entity(Position(0, 0), Sprite(images[1], images[1].get_rect(), layer=3))
+        self.world.remove_entity(top)
+        self.world.cleanup_entities()
+        self.screen.blits.reset_mock()
+        self.render_system.process()
+        drawn = [batch[0][0][0] for batch, _ in self.screen.blits.call_args_list]
+        self.assertEqual(drawn, [images[0], images[1]])
+
+        # A layer change takes effect from the next frame on
+        self.world.get_component(middle, Sprite).layer = 0
+        self.render_system.process()
+        self.screen.blits.reset_mock()
+        self.render_system.process()
+        drawn = [batch[0][0][0] for batch, _ in self.screen.blits.call_args_list]
+        self.assertEqual(drawn, [images[1], images[0]])
+
+    def test_culls_sprites_outside_view(self):
+        image = pygame.Surface((20, 20))
+        self.world.create_entity(Position(100, 100), Sprite(image, image.get_rect()))
+        self.world.create_entity(Position(100, -70), Sprite(image, image.get_rect()), Rotation(angle=45))
+        self.world.create_entity(Position(-20, 100), Sprite(image, image.get_rect())) # within the margin
+        self.render_system.process()
+        self.assertEqual(len(self.screen.blits.call_args[0][0]), 2)
+        self.assertEqual(self.render_system.culled, 1)
+        self.assertEqual(self.render_system.rotation_cache.misses, 0)
+
+    def test_scaled_render_uses_canvas_coordinates(self):
+        self.render_system.scale = 0.5
+        image = pygame.Surface((20, 40))
+        self.world.create_entity(Position(100, 200), Sprite(image, image.get_rect()))
+        self.render_system.process()
+        self.render_system.process()
+        [(blitted_image, rect)] = self.screen.blits.call_args[0][0]
+        self.assertEqual(blitted_image.get_size(), (10, 20))
+        self.assertEqual(rect.center, (50, 100))
+        self.assertEqual(len(self.render_system.scaled_images), 1)
+
+    def test_upscale_fills_screen(self):
+        from systems import UpscaleSystem
+        canvas = pygame.Surface((2, 2))
+        canvas.fill((255, 0, 0))
+        screen = pygame.Surface((4, 4))
+        UpscaleSystem(canvas, screen).process()
+        self.assertEqual(screen.get_at((3, 3)), (255, 0, 0, 255))
+
+    def test_removing_rotation_updates_bucket(self):
+        image = pygame.Surface((10, 20))
+        entity_id = self.world.create_entity(Position(0, 0), Sprite(image, image.get_rect()), Rotation(angle=90))
+        self.render_system.process()
+        self.world.remove_component(entity_id, Rotation)
+        self.render_system.process()
+        [(blitted_image, rect)] = self.screen.blits.call_args[0][0]
+        self.assertIs(blitted_image, image)
+
+class TestRotationCache(unittest.TestCase):
+    def test_angles_share_buckets(self):
+        cache = RotationCache(steps=64)
+        image = pygame.Surface((10, 10))
+        self.assertIs(cache.get(image, 90), cache.get(image, 91))
+        self.assertIs(cache.get(image, 0), cache.get(image, 360))
+        self.assertEqual(len(cache), 2)
+
+    def test_evicts_least_recently_used(self):
+        image = pygame.Surface((10, 10))
+        one_rotation = image.get_bytesize() * 100
+        cache = RotationCache(steps=4, max_bytes=one_rotation * 2)
+        first = cache.get(image, 0)
+        cache.get(image, 90)
+        cache.get(image, 0)
+        cache.get(image, 180)
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get(image, 0), first)
+        self.assertLessEqual(cache.size, cache.max_bytes)
+
+    def test_warm_fills_every_bucket(self):
+        cache = RotationCache(steps=8)
+        cache.warm([pygame.Surface((4, 4))])
+        self.assertEqual(len(cache), 8)
+
+class TestAssetManager(unittest.TestCase):
+    def setUp(self):
+        self.loaded = Mock(convert_alpha=Mock(side_effect=lambda: pygame.Surface((10, 10))))
+        patcher = patch.object(pygame.image, 'load', return_value=self.loaded)
+        self.load = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_loads_each_file_once_and_memoizes_variants(self):
+        assets = AssetManager()
+        image = assets.get('rock1.png')
+        self.assertIs(assets.get('rock1.png'), image)
+        scaled = assets.get('rock1.png', (20, 20))
+        self.assertEqual(scaled.get_size(), (20, 20))
+        self.assertIs(assets.get('rock1.png', [20, 20]), scaled)
+        self.assertEqual(self.load.call_count, 1)
+        self.assertEqual(assets.loads, 1)
+
+    def test_scales_given_images_once(self):
+        assets = AssetManager()
+        image = pygame.Surface((10, 10))
+        scaled = assets.scale(image, (4, 4))
+        self.assertEqual(scaled.get_size(), (4, 4))
+        self.assertIs(assets.scale(image, [4, 4]), scaled)
+        self.assertEqual(assets.size, 4 * 4 * scaled.get_bytesize())
+
+    def test_evicts_only_released_entries(self):
+        assets = AssetManager(max_bytes=2 * 10 * 10 * 4)
+        pinned = assets.acquire('a.png')
+        assets.acquire('b.png')
+        assets.get('c.png')
+        self.assertNotIn(assets.key('c.png'), assets.surfaces)
+        assets.release('b.png')
+        assets.get('d.png')
+        self.assertNotIn(assets.key('b.png'), assets.surfaces)
+        self.assertIs(assets.get('a.png'), pinned)
+        self.assertLessEqual(assets.size, assets.max_bytes)
+
+class TestDirtyRects(unittest.TestCase):
+    def setUp(self):
+        self.screen = pygame.Surface((100, 100))
+        self.background = pygame.Surface((100, 100))
+        self.background.fill((0, 0, 255))
+        self.dirty = DirtyRects(self.background)
+
+    def test_first_frame_repaints_everything(self):
+        self.screen.fill((255, 0, 0))
+        self.dirty.restore(self.screen)
+        self.assertEqual(self.screen.get_at((99, 99)), (0, 0, 255, 255))
+        self.assertEqual(self.dirty.flush(), [pygame.Rect(0, 0, 100, 100)])
+
+    def test_restores_and_pushes_only_drawn_areas(self):
+        self.dirty.restore(self.screen)
+        self.dirty.flush()
+        self.dirty.add(self.screen.fill((255, 0, 0), pygame.Rect(10, 10, 5, 5)))
+        self.screen.fill((0, 255, 0), pygame.Rect(50, 50, 5, 5)) # not recorded, left alone
+        self.assertEqual(self.dirty.flush(), [pygame.Rect(10, 10, 5, 5)])
+
+        self.dirty.restore(self.screen)
+        self.dirty.add(pygame.Rect(20, 20, 5, 5))
+        self.assertEqual(self.screen.get_at((12, 12)), (0, 0, 255, 255))
+        self.assertEqual(self.screen.get_at((52, 52)), (0, 255, 0, 255))
+        self.assertEqual(self.dirty.flush(), [pygame.Rect(10, 10, 5, 5), pygame.Rect(20, 20, 5, 5)])
+
+    def test_scrollex_records_drawn_sprites(self):
+        game = ScrollexGame(self.screen, dirty_rects=True)
+        game.dirty.background = self.background
+        game.parent = Mock()
+        game.parent.GetPaused.return_value = False
+        game.world.add_system(RenderSystem(self.screen, dirty=game.dirty))
+        image = pygame.Surface((10, 10))
+        game.world.create_entity(Position(30, 30), Sprite(image, image.get_rect()))
+        game.draw()
+        game.get_dirty_rects()
+        game.draw()
+        self.assertEqual(game.get_dirty_rects(), [pygame.Rect(25, 25, 10, 10), pygame.Rect(25, 25, 10, 10)])
+
+class TestTextCache(unittest.TestCase):
+    def test_renders_each_text_once(self):
+        font = Mock()
+        cache = TextCache(max_size=2)
+        first = cache.render(font, "Score: 1")
+        self.assertIs(cache.render(font, "Score: 1"), first)
+        font.render.assert_called_once_with("Score: 1", True, WHITE)
+
+    def test_evicts_least_recently_used(self):
+        font = Mock()
+        font.render.side_effect = lambda text, antialias, color: text
+        cache = TextCache(max_size=2)
+        cache.render(font, "a")
+        cache.render(font, "b")
+        cache.render(font, "a")
+        cache.render(font, "c")
+        self.assertEqual(list(cache.surfaces), [(font, "a", WHITE), (font, "c", WHITE)])
+
+    def test_hud_renders_only_changed_values(self):
+        from systems import UISystem
+        world = World()
+        ui = UISystem(Mock())
+        ui.font = Mock()
+        ui.font.render.side_effect = lambda text, antialias, color: Mock(text=text)
+        world.add_system(ui)
+        game_state = GameState()
+        world.create_entity(game_state)
+        ui.process()
+        ui.process()
+        game_state.score = 7
+        ui.process()
+        rendered = [call[0][0] for call in ui.font.render.call_args_list]
+        self.assertEqual(rendered, ["Score: 0", "Scrap: 0", "Ore: 0", "XP: 0", "Score: 7"])
+
+class TestParallaxBackground(unittest.TestCase):
+    def test_layer_wraps_and_interpolates(self):
+        layer = ScrollLayer(pygame.Surface((4, 100)), speed=0.5)
+        layer.scroll(180)
+        self.assertEqual(layer.offset, 90)
+        layer.scroll(40)
+        self.assertEqual(layer.offset, 10)
+        self.assertAlmostEqual(layer.offset_at(0.5), 0)
+
+    def test_blit_wrapped_moves_bottom_to_top(self):
+        image = pygame.Surface((1, 10))
+        image.fill((255, 0, 0))
+        image.fill((0, 255, 0), pygame.Rect(0, 7, 1, 3))
+        target = pygame.Surface((1, 10))
+        blit_wrapped(target, image, 3)
+        self.assertEqual(target.get_at((0, 0)), (0, 255, 0, 255))
+        self.assertEqual(target.get_at((0, 3)), (255, 0, 0, 255))
+
+    def test_hard_edged_layer_becomes_colour_keyed(self):
+        stars = pygame.Surface((10, 10), pygame.SRCALPHA)
+        stars.set_at((2, 2), (200, 200, 200, 255))
+        prepared = prepare_layer(stars)
+        self.assertFalse(prepared.get_flags() & pygame.SRCALPHA)
+        self.assertIsNotNone(prepared.get_colorkey())
+        soft = pygame.Surface((10, 10), pygame.SRCALPHA)
+        soft.fill((200, 200, 200, 128))
+        self.assertIs(prepare_layer(soft), soft)
+
+    def test_bake_merges_slow_layers_into_base(self):
+        background = ParallaxBackground((10, 10))
+        background.add_static(pygame.Surface((5, 5)))
+        slow = pygame.Surface((10, 10), pygame.SRCALPHA)
+        slow.set_at((0, 0), (255, 255, 255, 255))
+        background.add_layer(slow, 0.01)
+        background.add_layer(pygame.Surface((10, 10), pygame.SRCALPHA), 0.05)
+        background.bake(0.02)
+        self.assertEqual(len(background.layers), 1)
+        self.assertEqual(background.base_layer.speed, 0.01)
+        self.assertEqual(background.composite().get_at((0, 0)), (255, 255, 255, 255))
+
+class TestTextureAtlas(unittest.TestCase):
+    def test_packs_images_and_looks_them_up_by_name(self):
+        atlas = TextureAtlas(page_size=(10, 10))
+        red = pygame.Surface((4, 4), pygame.SRCALPHA)
+        red.fill((255, 0, 0, 128))
+        atlas.add('red', red)
+        atlas.add('wide', pygame.Surface((6, 3)))
+        atlas.add('square', pygame.Surface((5, 5)))
+        atlas.add('huge', pygame.Surface((20, 5)))
+        atlas.build()
+        self.assertEqual(len(atlas), 4)
+        self.assertEqual(len(atlas.pages), 2)
+        self.assertEqual(atlas['red'].get_size(), (4, 4))
+        self.assertEqual(atlas['red'].get_at((0, 0)), (255, 0, 0, 128))
+        page, rect = atlas.region('red')
+        self.assertIs(atlas['red'].get_parent(), page)
+        self.assertEqual(page.get_at(rect.topleft), (255, 0, 0, 128))
+        # Packed regions never overlap
+        rects = [atlas.region(name)[1] for name in ('red', 'wide', 'square')]
+        for i, first in enumerate(rects):
+            for second in rects[i + 1:]:
+                self.assertFalse(first.colliderect(second))
+        self.assertIsNone(atlas.get(sized_name('red', (8, 8))))
+
+class TestParticleField(unittest.TestCase):
+    def test_step_moves_and_compacts_expired(self):
+        particles = ParticleField(capacity=8, seed=1)
+        particles.emit(10, 20, 3, ttl=(50, 50))
+        particles.emit(0, 0, 2, ttl=(200, 200))
+        particles.step(16)
+        self.assertEqual(len(particles), 5)
+        self.assertTrue(np.allclose(particles.prev_x[:3], 10))
+        self.assertTrue(np.allclose(particles.x[:3], 10 + particles.dx[:3] * 16))
+        particles.step(40)
+        self.assertEqual(len(particles), 2)
+        self.assertTrue(np.allclose(particles.ttl[:2], 144))
+
+    def test_emit_drops_past_capacity(self):
+        particles = ParticleField(capacity=4)
+        particles.emit(0, 0, 3)
+        particles.emit(0, 0, 3)
+        self.assertEqual(len(particles), 4)
+
+    def test_draw_batches_per_colour(self):
+        particles = ParticleField(capacity=8)
+        particles.emit(5, 5, 2, speed=0)
+        particles.emit(-50, 5, 1, speed=0) # off screen
+        particles.emit(10, 10, 1, speed=0, color=(255, 0, 0))
+        surface = pygame.Surface((20, 20))
+        rects = particles.draw(surface, rects=True)
+        self.assertEqual(len(rects), 3)
+        self.assertEqual(surface.get_at((5, 5)), (128, 128, 128, 255))
+        self.assertEqual(surface.get_at((10, 10)), (255, 0, 0, 255))
+
+    def test_hit_particles_are_not_entities(self):
+        world = World()
+        collision = CollisionSystem({'sm': []}, [Mock()], [Mock()], [Mock()])
+        world.add_system(collision)
+        collision.create_hit_particles(Position(100, 100))
+        self.assertEqual(len(world.entities), 0)
+        self.assertGreaterEqual(len(collision.particles), 3)
+
+class TestFixedTimestep(unittest.TestCase):
+    def setUp(self):
+        self.game = ScrollexGame(Mock())
+        self.system = Mock()
+        self.system.is_render_system = False
+        self.game.world.add_system(self.system)
+        self.game.check_player_death = Mock()
+
+    def test_runs_fixed_ticks_and_keeps_remainder(self):
+        from gameconst import SIM_DT
+        self.game.update(SIM_DT * 2.5, [])
+        self.assertEqual(self.system.process.call_count, 2)
+        self.system.process.assert_called_with(SIM_DT)
+        self.assertAlmostEqual(self.game.world.interpolation_alpha, 0.5)
+        self.game.update(SIM_DT * 0.5, [])
+        self.assertEqual(self.system.process.call_count, 3)
+
+    def test_long_frame_is_clamped(self):
+        from gameconst import MAX_SIM_STEPS
+        self.game.update(10000, [])
+        self.assertEqual(self.system.process.call_count, MAX_SIM_STEPS)
+        self.assertTrue(self.game.skip_draw)
+        self.game.update(0, [])
+        self.assertFalse(self.game.skip_draw)
+
 class TestPlayerControlSystem(unittest.TestCase):
     def setUp(self):
         self.world = World()
@@ -578,6 +1200,163 @@ class TestCollisionSystem(unittest.TestCase):
         mock_create_explosion.assert_called_once() # Explosion created
         mock_create_hit_particles.assert_called_once() # Hit particles created
 
+    def test_mob_mob_collision_bounces(self):
+        vel1 = Velocity(0.1, 0)
+        vel2 = Velocity(-0.1, 0)
+        self.world.create_entity(Position(0, 0), Collision(10), Mob(type='small'), vel1, Rotation())
+        self.world.create_entity(Position(15, 0), Collision(10), Mob(type='small'), vel2, Rotation())
+        self.world.create_entity(Position(500, 0), Collision(10), Mob(type='small'), Velocity(-0.1, 0), Rotation())
+        self.collision_system.process(16)
+        self.assertLess(vel1.dx, 0)
+        self.assertGreater(vel2.dx, 0)
+
+    @patch('systems.CollisionSystem.create_hit_particles')
+    def test_distant_bullet_does_not_hit(self, mock_create_hit_particles):
+        mob = Mob(type='small', health=1)
+        self.world.create_entity(Position(0, 0), Collision(10), mob, Velocity(), Rotation())
+        self.world.create_entity(Position(300, 300), Collision(5), Bullet(damage=1))
+        self.collision_system.process(16)
+        self.assertEqual(mob.health, 1)
+        mock_create_hit_particles.assert_not_called()
+
+class TestSpatialHash(unittest.TestCase):
+    def setUp(self):
+        self.grid = SpatialHash(cell_size=100)
+
+    def test_query_finds_items_in_overlapping_cells(self):
+        self.grid.insert('near', 50, 50, 10)
+        self.grid.insert('edge', 195, 50, 10) # Spans two cells
+        self.grid.insert('far', 1000, 1000, 10)
+        self.assertEqual(self.grid.query(60, 60, 5), {'near'})
+        self.assertEqual(self.grid.query(210, 50, 5), {'edge'})
+        self.assertEqual(self.grid.query(-500, -500, 5), set())
+
+    def test_pairs_are_unique(self):
+        self.grid.insert(0, 100, 100, 20) # Spans four cells
+        self.grid.insert(1, 110, 110, 20)
+        self.grid.insert(2, 900, 900, 20)
+        self.assertEqual(self.grid.pairs(), {(0, 1)})
+
+class TestNarrowPhase(unittest.TestCase):
+    def test_returns_overlapping_pairs_in_order(self):
+        a = (np.array([0.0, 100.0]), np.array([0.0, 0.0]), np.array([5.0, 5.0]))
+        b = (np.array([8.0, 50.0, 104.0]), np.array([0.0, 0.0, 3.0]), np.array([5.0, 5.0, 1.0]))
+        hit_a, hit_b = narrow_phase(a, b, [0, 0, 1, 1], [0, 1, 1, 2])
+        self.assertEqual(list(zip(hit_a.tolist(), hit_b.tolist())), [(0, 0), (1, 2)])
+
+    def test_swept_catches_pass_through(self):
+        mob = (np.array([0.0]), np.array([0.0]), np.array([15.0]))
+        bullet = (np.array([0.0, 40.0]), np.array([-100.0, -100.0]), np.array([5.0, 5.0]))
+        bullet_start = (np.array([0.0, 40.0]), np.array([100.0, 100.0]))
+        hit_a, hit_b = swept_phase(bullet, bullet_start, mob, mob[:2], [0, 1], [0, 0])
+        self.assertEqual(hit_a.tolist(), [0])
+        # At rest the swept test is the plain overlap test
+        hit_a, _ = swept_phase(mob, mob[:2], mob, mob[:2], [0], [0])
+        self.assertEqual(hit_a.tolist(), [0])
+
+    def test_no_candidates(self):
+        a = (np.zeros(0), np.zeros(0), np.zeros(0))
+        hit_a, hit_b = narrow_phase(a, a, [], [])
+        self.assertEqual(len(hit_a), 0)
+
+class TestContactSystem(unittest.TestCase):
+    def setUp(self):
+        self.world = World(columnar=True)
+        self.contact_system = ContactSystem()
+        self.world.add_system(self.contact_system)
+
+    def test_layers_filter_pairs(self):
+        mob_id = self.world.create_entity(Position(0, 0), Collision(10, LAYER_MOB))
+        bullet_id = self.world.create_entity(Position(5, 0), Collision(5, LAYER_BULLET))
+        other_bullet_id = self.world.create_entity(Position(6, 0), Collision(5, LAYER_BULLET))
+        self.world.create_entity(Position(0, 5), Collision(5, LAYER_LOOT))
+        self.world.create_entity(Position(0, 0), Collision(5, LAYER_EFFECT))
+        self.contact_system.process(16)
+        self.assertEqual(self.world.contacts, {(LAYER_MOB, LAYER_BULLET): [(mob_id, bullet_id), (mob_id, other_bullet_id)]})
+        self.assertEqual(get_contacts(self.world, LAYER_BULLET, LAYER_MOB), [(bullet_id, mob_id), (other_bullet_id, mob_id)])
+
+    def test_swept_bullet_does_not_tunnel(self):
+        mob_id = self.world.create_entity(Position(0, 0), Collision(15, LAYER_MOB))
+        swept = Position(0, 100)
+        swept.x, swept.y = 0, -100
+        plain = Position(0, 100)
+        plain.x, plain.y = 0, -100
+        bullet_id = self.world.create_entity(swept, Collision(5, LAYER_BULLET, swept=True))
+        # The same jump without the flag only looks at where it landed
+        self.world.create_entity(plain, Collision(5, LAYER_BULLET))
+        self.contact_system.process(16)
+        self.assertEqual(get_contacts(self.world, LAYER_BULLET, LAYER_MOB), [(bullet_id, mob_id)])
+
+    def test_default_layer_touches_every_layer(self):
+        general_id = self.world.create_entity(Position(0, 0), Collision(10))
+        bullet_id = self.world.create_entity(Position(5, 0), Collision(5, LAYER_BULLET))
+        self.world.create_entity(Position(0, 5), Collision(5, LAYER_EFFECT))
+        self.contact_system.process(16)
+        self.assertEqual(get_contacts(self.world, LAYER_BULLET, LAYER_MOB), [(bullet_id, general_id)])
+
+    def test_default_layer_pair_within_one_layer_is_listed_once(self):
+        general_id = self.world.create_entity(Position(0, 0), Collision(10))
+        mob_id = self.world.create_entity(Position(5, 0), Collision(10, LAYER_MOB))
+        self.contact_system.process(16)
+        self.assertEqual(get_contacts(self.world, LAYER_MOB, LAYER_MOB), [(mob_id, general_id)])
+
+    def test_entity_mask_overrides_layer_default(self):
+        self.world.create_entity(Position(0, 0), Collision(10, LAYER_MOB, mask=LAYER_PLAYER))
+        self.world.create_entity(Position(5, 0), Collision(10, LAYER_MOB))
+        self.contact_system.process(16)
+        self.assertEqual(get_contacts(self.world, LAYER_MOB, LAYER_MOB), [])
+
+    def test_contacts_reset_after_update(self):
+        self.world.create_entity(Position(0, 0), Collision(10, LAYER_MOB))
+        self.world.create_entity(Position(5, 0), Collision(10, LAYER_MOB))
+        seen = []
+        probe = System()
+        probe.process = lambda dt: seen.append(get_contacts(self.world, LAYER_MOB, LAYER_MOB))
+        self.world.add_system(probe)
+        self.world.process_update(16)
+        self.assertEqual(len(seen[0]), 1)
+        self.assertIsNone(self.world.contacts)
+
+class TestContactSolver(unittest.TestCase):
+    def test_isolated_pair_gets_restitution_impulse(self):
+        solver = ContactSolver(restitution=0.8, iterations=4)
+        x, y = np.array([0.0, 15.0]), np.array([0.0, 0.0])
+        vx, vy, impulses = solver.solve([1, 2], x, y, [0.1, -0.1], [0.0, 0.0], [1.0, 1.0], [0], [1])
+        # -(1 + e) * v_n / (1/m1 + 1/m2) = 1.8 * 0.2 / 2
+        self.assertAlmostEqual(impulses[0], 0.18)
+        self.assertAlmostEqual(vx[0], -0.08)
+        self.assertAlmostEqual(vx[1], 0.08)
+
+    def test_separating_pair_is_left_alone(self):
+        solver = ContactSolver()
+        vx, vy, impulses = solver.solve([1, 2], np.array([0.0, 15.0]), np.array([0.0, 0.0]),
+                                        [-0.1, 0.1], [0.0, 0.0], [1.0, 1.0], [0], [1])
+        self.assertEqual(impulses[0], 0)
+        self.assertEqual(vx.tolist(), [-0.1, 0.1])
+
+    def test_cluster_does_not_gain_energy(self):
+        solver = ContactSolver(restitution=0.8, iterations=8)
+        # One rock driven into two resting ones
+        x, y = np.array([0.0, 15.0, 15.0]), np.array([0.0, -8.0, 8.0])
+        vx, vy, _ = solver.solve([1, 2, 3], x, y, [0.2, 0.0, 0.0], [0.0, 0.0, 0.0],
+                                 [1.0, 1.0, 1.0], [0, 0], [1, 2])
+        self.assertLessEqual((vx ** 2 + vy ** 2).sum(), 0.2 ** 2 + 1e-12)
+        self.assertAlmostEqual(vx.sum(), 0.2)
+
+    def test_resting_island_falls_asleep(self):
+        solver = ContactSolver(sleep_speed=0.01, sleep_frames=3)
+        x, y = np.array([0.0, 15.0]), np.array([0.0, 0.0])
+        for _ in range(3):
+            _, __, impulses = solver.solve(['a', 'b'], x, y, [0.001, 0.0], [0.0, 0.0], [1.0, 1.0], [0], [1])
+        self.assertEqual(impulses[0], 0)
+        # A fast hit wakes it again
+        _, __, impulses = solver.solve(['a', 'b'], x, y, [0.5, 0.0], [0.0, 0.0], [1.0, 1.0], [0], [1])
+        self.assertGreater(impulses[0], 0)
+
+    def test_find_islands(self):
+        islands = find_islands(5, [0, 3], [1, 4])
+        self.assertEqual(islands.tolist(), [0, 0, 2, 3, 3])
+
 class TestLifetimeSystem(unittest.TestCase):
     def setUp(self):
         self.world = World()
@@ -596,6 +1375,16 @@ class TestLifetimeSystem(unittest.TestCase):
 
         self.assertNotIn(entity_id, self.world.entities) # Entity should be removed
 
+    def test_columnar_world_removes_expired(self):
+        world = World(columnar=True)
+        world.add_system(self.lifetime_system)
+        expired_id = world.create_entity(Lifetime(time_to_live=100))
+        alive_id = world.create_entity(Lifetime(time_to_live=500))
+        self.lifetime_system.process(101)
+        world.cleanup_entities()
+        self.assertNotIn(expired_id, world.entities)
+        self.assertEqual(world.get_component(alive_id, Lifetime).time_to_live, 399)
+
 class TestLootSystem(unittest.TestCase):
     def setUp(self):
         self.world = World()
@@ -612,9 +1401,64 @@ class TestLootSystem(unittest.TestCase):
         self.assertEqual(self.game_state.score, 10)
         self.assertIsNone(self.world.get_component(loot_id, Loot)) # Loot removed
 
+    def test_columnar_world_collects_only_touching_loot(self):
+        world = World(columnar=True)
+        world.add_system(self.loot_system)
+        world.create_entity(Position(0, 0), Collision(10), PlayerInput())
+        game_state = GameState()
+        world.create_entity(game_state)
+        near_id = world.create_entity(Position(12, 0), Collision(5), Loot(type='ore', value=10))
+        far_id = world.create_entity(Position(100, 0), Collision(5), Loot(type='xp', value=20))
+        self.loot_system.process(16)
+        world.cleanup_entities()
+        self.assertEqual((game_state.score, game_state.ore, game_state.xp), (10, 1, 0))
+        self.assertNotIn(near_id, world.entities)
+        self.assertIn(far_id, world.entities)
+
+    def test_only_players_collect_loot(self):
+        world = World(columnar=True)
+        world.add_system(self.loot_system)
+        game_state = GameState()
+        world.create_entity(game_state)
+        world.create_entity(Position(500, 0), Collision(5), Loot(type='ore', value=10))
+        world.create_entity(Position(503, 0), Collision(5), Loot(type='xp', value=20))
+        world.create_entity(Position(900, 0), Collision(10), Mob(type='small'))
+        world.create_entity(Position(905, 0), Collision(5, LAYER_LOOT), Loot(type='scrap', value=5))
+        self.loot_system.process(16)
+        world.cleanup_entities()
+        self.assertEqual(game_state.score, 0)
+        self.assertEqual(world.query(Loot).count(), 3)
+
 
 # --- Utils Tests ---
 
+# --- Benchmark Tests ---
+
+class TestBench(unittest.TestCase):
+    @patch('pygame.mouse.get_pressed', return_value=(0, 0, 0))
+    @patch('pygame.key.get_pressed', return_value=[0]*300)
+    def test_run_keeps_bullets_and_particles_topped_up(self, mock_key_get_pressed, mock_mouse_get_pressed):
+        bullet_size = Player().bullet_size
+        atlas = TextureAtlas()
+        atlas.add(sized_name('bullet', bullet_size), pygame.Surface(bullet_size))
+        atlas.build()
+        world = World(columnar=True)
+        collision = CollisionSystem({'sm': []}, [Mock()], [Mock()], [Mock()])
+        # Counts what every frame starts with
+        seen = []
+        probe = System()
+        probe.process = lambda dt: seen.append((world.query(Bullet).count(), len(collision.particles)))
+        for system in (probe, MovementSystem(), PlayerControlSystem(atlas), collision, ParticleSystem(collision.particles),
+                       BoundarySystem(), MobSpawningSystem([Mock()])):
+            world.add_system(system)
+        bench.populate(world, bullets=20, particles=30)
+        elapsed = bench.run(world, 30, 100, bullets=20, particles=30) # long enough for every bullet and particle to go
+        self.assertGreater(elapsed, 0)
+        self.assertEqual(len(seen), 30)
+        for bullets, particles in seen:
+            self.assertEqual(bullets, 20)
+            self.assertGreaterEqual(particles, 30)
+
 class TestButton(unittest.TestCase):
     def setUp(self):
         self.button = Button(x=0, y=0, width=100, height=50, text="Test Button")
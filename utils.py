@@ -1,6 +1,8 @@
 import pygame
 from gameconst import *
 from os import path
+from collections import OrderedDict
+from functools import lru_cache
 import random
 
 font_name = pygame.font.match_font('arial')
@@ -9,9 +11,42 @@ all_sprites = pygame.sprite.Group()
 mobs = pygame.sprite.Group() 
 bullets = pygame.sprite.Group() 
 
+@lru_cache(maxsize=None)
+def get_font(name, size):
+    """Load a font once per (name, size)."""
+    return pygame.font.Font(name, size)
+
+class TextCache:
+    """Rendered text surfaces keyed by (font, text, color), with the least recently used evicted past max_size."""
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def render(self, font, text, color=WHITE):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.surfaces[key] = font.render(text, True, color)
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+text_cache = TextCache()
+
 def draw_text(surf, text, size, x, y):
-    font = pygame.font.Font(font_name, size)
-    text_surface = font.render(text, True, WHITE)
+    text_surface = text_cache.render(get_font(font_name, size), text, WHITE)
     text_rect = text_surface.get_rect()
     text_rect.midtop = (x, y)
     surf.blit(text_surface, text_rect)
@@ -72,13 +107,197 @@ class Button:
                 return True
         return False
 
+class SilentSound:
+    """Stand-in for pygame.mixer.Sound when running without an audio device."""
+    def play(self, *args, **kwargs):
+        return None
+
+class RotationCache:
+    """Rotated copies of images, keyed by (image, angle bucket), with a least-recently-used memory cap.
+
+    Angles are snapped to one of steps buckets per turn, so a spinning sprite
+    only ever needs that many surfaces. max_bytes bounds the pixel memory held.
+    """
+    def __init__(self, steps=ROTATION_STEPS, max_bytes=ROTATION_CACHE_MB * 1024 * 1024):
+        self.steps = steps
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.images = OrderedDict()
+
+    def __len__(self):
+        return len(self.images)
+
+    def bucket(self, angle):
+        return round(angle * self.steps / 360) % self.steps
+
+    def get(self, image, angle):
+        """Get image rotated by angle snapped to the nearest bucket."""
+        key = (image, self.bucket(angle))
+        rotated = self.images.get(key)
+        if rotated is not None:
+            self.images.move_to_end(key)
+            self.hits += 1
+            return rotated
+        self.misses += 1
+        return self._add(key)
+
+    def warm(self, images):
+        """Fill in every bucket of the given images ahead of time."""
+        for image in images:
+            for bucket in range(self.steps):
+                if (image, bucket) not in self.images:
+                    self._add((image, bucket))
+
+    def clear(self):
+        self.images.clear()
+        self.size = 0
+
+    def _add(self, key):
+        image, bucket = key
+        rotated = pygame.transform.rotate(image, bucket * 360 / self.steps)
+        self.images[key] = rotated
+        self.size += surface_bytes(rotated)
+        while self.size > self.max_bytes and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.size -= surface_bytes(evicted)
+        return rotated
+
+class DirtyRects:
+    """Screen areas drawn in the last two frames, so only those get restored and pushed to the display.
+
+    A frame starts with restore(), which paints the background back over what
+    the previous frame drew, the render code then add()s every area it draws
+    and flush() returns the areas for pygame.display.update. After
+    invalidate() the next frame repaints and pushes the whole screen.
+    """
+    def __init__(self, background=None):
+        self.background = background
+        self.previous = []
+        self.current = []
+        self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def restore(self, screen):
+        if self.full:
+            self.previous = [screen.get_rect()]
+        for rect in self.previous:
+            if self.background is None:
+                screen.fill(BLACK, rect)
+            else:
+                screen.blit(self.background, rect, rect)
+
+    def flush(self):
+        """Get the areas changed since the last flush and start tracking the next frame."""
+        rects = self.previous + self.current
+        self.previous, self.current = self.current, []
+        self.full = False
+        return rects
+
+class AssetManager:
+    """Images loaded from img_dir once and shared, with their scaled variants.
+
+    Every surface is memoized by (file name, alpha, size), so a
+    file is read, decoded and converted only the first time anyone asks for
+    it. acquire() pins an entry for as long as its user needs it, release()
+    unpins it. Unpinned entries stay cached and are evicted least recently
+    used first once the cached pixels exceed max_bytes.
+    """
+    def __init__(self, directory=img_dir, max_bytes=ASSET_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.loads = 0
+        self.surfaces = OrderedDict()
+        self.refs = {}
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def key(self, name, size=None, alpha=True):
+        return (name, alpha, tuple(size) if size is not None else None)
+
+    def get(self, name, size=None, alpha=True):
+        """Get an image, scaled to size if given."""
+        key = self.key(name, size, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        name, alpha, size = key
+        if size is not None:
+            surface = pygame.transform.scale(self.get(name, None, alpha), size)
+        else:
+            surface = pygame.image.load(path.join(self.directory, name))
+            surface = surface.convert_alpha() if alpha else surface.convert()
+            self.loads += 1
+        return self.store(key, surface)
+
+    def scale(self, image, size):
+        """Get an already loaded image scaled to size, cached and evicted like the loaded ones."""
+        key = (image, tuple(size))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        return self.store(key, pygame.transform.scale(image, key[1]))
+
+    def store(self, key, surface):
+        self.surfaces[key] = surface
+        self.size += surface_bytes(surface)
+        self.evict()
+        return surface
+
+    def acquire(self, name, size=None, alpha=True):
+        """Get an image and keep it from being evicted until it is released."""
+        surface = self.get(name, size, alpha)
+        key = self.key(name, size, alpha)
+        self.refs[key] = self.refs.get(key, 0) + 1
+        return surface
+
+    def release(self, name, size=None, alpha=True):
+        key = self.key(name, size, alpha)
+        count = self.refs.get(key, 0) - 1
+        if count > 0:
+            self.refs[key] = count
+        else:
+            self.refs.pop(key, None)
+            self.evict()
+
+    def evict(self):
+        """Drop unpinned entries, oldest first, until the cache fits in max_bytes."""
+        if self.size <= self.max_bytes:
+            return
+        for key in [key for key in self.surfaces if key not in self.refs]:
+            self.size -= surface_bytes(self.surfaces.pop(key))
+            if self.size <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Drop every unpinned entry."""
+        for key in [key for key in self.surfaces if key not in self.refs]:
+            self.size -= surface_bytes(self.surfaces.pop(key))
+
+assets = AssetManager()
+
+def surface_bytes(surface):
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
 def load_explosion_animation():
     explosion_anim = {}
     explosion_anim['lg'] = []
     explosion_anim['sm'] = []
-    explosion_sheet = spritesheet(path.join(img_dir, 'explosion_transparent.png'))
+    explosion_sheet = assets.get('explosion_transparent.png')
     for i in range(25):
-        img = explosion_sheet.image_at((i % 5 * 64, i // 5 * 64, 64, 64))
+        # Scale straight from a view into the sheet instead of copying each frame out first
+        img = explosion_sheet.subsurface((i % 5 * 64, i // 5 * 64, 64, 64))
         img_lg = pygame.transform.scale(img, (75, 75))
         explosion_anim['lg'].append(img_lg)
         img_sm = pygame.transform.scale(img, (32, 32))